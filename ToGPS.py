@@ -1,5 +1,7 @@
 import math
 
+import numpy as np
+
 # 定义常量
 PI = 3.14159265358979324
 A = 6378245.0  # 长半轴
@@ -45,24 +47,81 @@ def gcj02_to_wgs84(lon, lat):
     mg_lon = lon + d_lon
     return lon * 2 - mg_lon, lat * 2 - mg_lat
 
-# 批量转换函数，支持(经度, 纬度)和(纬度, 经度)两种输入
-def batch_gcj02_to_wgs84(coordinates, coord_format="lon_lat"):
+# 向量化版本：对整个数组一次性计算，公式与上面的标量函数逐项一致
+def out_of_china_array(lon, lat):
+    return (lon < 72.004) | (lon > 137.8347) | (lat < 0.8293) | (lat > 55.8271)
+
+
+def transform_lon_array(lon, lat):
+    ret = 300.0 + lon + 2.0 * lat + 0.1 * lon * lon + 0.1 * lon * lat + 0.1 * np.sqrt(np.abs(lon))
+    ret += (20.0 * np.sin(6.0 * lon * PI) + 20.0 * np.sin(2.0 * lon * PI)) * 2.0 / 3.0
+    ret += (20.0 * np.sin(lon * PI) + 40.0 * np.sin(lon / 3.0 * PI)) * 2.0 / 3.0
+    ret += (150.0 * np.sin(lon / 12.0 * PI) + 300.0 * np.sin(lon / 30.0 * PI)) * 2.0 / 3.0
+    return ret
+
+
+def transform_lat_array(lon, lat):
+    ret = -100.0 + 2.0 * lon + 3.0 * lat + 0.2 * lat * lat + 0.1 * lon * lat + 0.2 * np.sqrt(np.abs(lon))
+    ret += (20.0 * np.sin(6.0 * lon * PI) + 20.0 * np.sin(2.0 * lon * PI)) * 2.0 / 3.0
+    ret += (20.0 * np.sin(lat * PI) + 40.0 * np.sin(lat / 3.0 * PI)) * 2.0 / 3.0
+    ret += (160.0 * np.sin(lat / 12.0 * PI) + 320.0 * np.sin(lat / 30.0 * PI)) * 2.0 / 3.0
+    return ret
+
+
+def gcj02_to_wgs84_array(coordinates, coord_format="lon_lat"):
     """
-    将一组GCJ-02坐标转换为WGS-84坐标。
+    将 (N, 2) 的 GCJ-02 坐标数组一次性转换为 WGS-84，境外坐标保持不变。
 
     参数:
-    coordinates (list of tuples): GCJ-02坐标列表，格式为 (lon, lat) 或 (lat, lon)。
-    coord_format (str): 输入的坐标格式，'lon_lat' 表示 (经度, 纬度)，'lat_lon' 表示 (纬度, 经度)。
+    coordinates (array-like): 形状为 (N, 2) 的坐标，格式为 (lon, lat) 或 (lat, lon)。
+    coord_format (str): 'lon_lat' 或 'lat_lon'。
 
     返回:
-    list of tuples: WGS-84坐标列表，格式与输入格式一致。
+    numpy.ndarray: 新的 (N, 2) float64 数组，列顺序与输入一致。
     """
+    points = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
     if coord_format == "lon_lat":
-        return [gcj02_to_wgs84(lon, lat) for lon, lat in coordinates]
+        lon_col, lat_col = 0, 1
     elif coord_format == "lat_lon":
-        return [tuple(reversed(gcj02_to_wgs84(lon, lat))) for lat, lon in coordinates]
+        lon_col, lat_col = 1, 0
     else:
         raise ValueError("Invalid coord_format. Use 'lon_lat' or 'lat_lon'.")
+    lon = points[:, lon_col]
+    lat = points[:, lat_col]
+
+    d_lat = transform_lat_array(lon - 105.0, lat - 35.0)
+    d_lon = transform_lon_array(lon - 105.0, lat - 35.0)
+    rad_lat = lat / 180.0 * PI
+    magic = np.sin(rad_lat)
+    magic = 1 - EE * magic * magic
+    sqrt_magic = np.sqrt(magic)
+    d_lat = (d_lat * 180.0) / ((A * (1 - EE)) / (magic * sqrt_magic) * PI)
+    d_lon = (d_lon * 180.0) / (A / sqrt_magic * np.cos(rad_lat) * PI)
+
+    outside = out_of_china_array(lon, lat)
+    result = np.empty_like(points)
+    result[:, lon_col] = np.where(outside, lon, lon * 2 - (lon + d_lon))
+    result[:, lat_col] = np.where(outside, lat, lat * 2 - (lat + d_lat))
+    return result
+
+
+# 批量转换函数，支持(经度, 纬度)和(纬度, 经度)两种输入
+def batch_gcj02_to_wgs84(coordinates, coord_format="lon_lat"):
+    """
+    将一组GCJ-02坐标转换为WGS-84坐标。
+
+    参数:
+    coordinates (list of tuples | numpy.ndarray): GCJ-02坐标，格式为 (lon, lat) 或 (lat, lon)。
+    coord_format (str): 输入的坐标格式，'lon_lat' 表示 (经度, 纬度)，'lat_lon' 表示 (纬度, 经度)。
+
+    返回:
+    list of tuples | numpy.ndarray: WGS-84坐标，格式与输入格式一致；输入为数组时返回 (N, 2) 数组。
+    """
+    result = gcj02_to_wgs84_array(coordinates, coord_format)
+    if isinstance(coordinates, np.ndarray):
+        return result
+    return [tuple(point) for point in result.tolist()]
+
 
 # 示例调用
 if __name__ == "__main__":
@@ -1,14 +1,87 @@
-from flask import Flask, render_template, request, jsonify
-from functions import load_attractions, load_paths, find_polylines_in_file, calculate_distance, load_paths_v2
-from ToGPS import batch_gcj02_to_wgs84
+import gc
+import hmac
+import json
+import logging
+import math
+import os
+import time
+
+import numpy as np
+
+from flask import Flask, g, render_template, request, jsonify
+import executors
+import metrics
+from cache import LRUCache
+from dataset import create_dataset
+from name_index import AttractionIndex
+from spatial_index import SpatialIndex
+from functions import (plan_itinerary, plan_alternatives, plan_mixed_itinerary, find_path, find_fast_path,
+                       parse_objective)
+from metrics import span
+from profiler import SamplingProfiler
+from route_codec import FORMAT_MIMETYPES, encode_polyline, pack_route
+from simplify import zoom_tolerance
+from tsp import MAX_BUDGET_MS, SolveCancelled
+
+# 日志级别由 NAV_LOG_LEVEL 指定（DEBUG 时输出每次规划的访问顺序和各阶段耗时）
+logging.basicConfig(level=os.environ.get('NAV_LOG_LEVEL', 'WARNING').upper(),
+                    format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
-# 加载景点和路径数据
-attractions = load_attractions('data/attractions_summary.txt')
-walk_paths = load_paths('data/walk.txt', attractions)
-drive_paths = load_paths('data/drive.txt', attractions)
-bus_paths1 = load_paths_v2('data/bus_quick.txt', attractions)
+# 各交通方式在地图上的颜色
+MODE_COLORS = {'walk': 'green', 'drive': 'blue', 'bus': 'red'}
+
+# 设置 NAV_PRELOAD=1 时在导入时加载全部数据并冻结（见 preload()），配合 gunicorn --preload 使用
+PRELOAD = os.environ.get('NAV_PRELOAD', '').lower() in ('1', 'true', 'yes')
+# 景点、各交通方式路线图和折线库，各部分在第一次使用时加载（源文件未变化时直接读取快照）；
+# 设置 NAV_BACKEND=sqlite 时改为从 SQLite 数据库按需查询
+dataset = create_dataset(frozen=True if PRELOAD else None)
+# 设置 NAV_WARM_UP=1 时在后台线程中提前加载全部数据，加载完成前 /ready 返回 503
+WARM_UP = os.environ.get('NAV_WARM_UP', '').lower() in ('1', 'true', 'yes')
+# /optimal_path 响应缓存，数据重新加载时清空
+route_cache = LRUCache(maxsize=int(os.environ.get('NAV_ROUTE_CACHE_SIZE', 1024)),
+                       ttl=float(os.environ.get('NAV_ROUTE_CACHE_TTL', 3600)) or None)
+# 慢请求采样分析，设置 NAV_PROFILE_SLOW_MS 后启用，见 profiler.py
+profiler = SamplingProfiler()
+# /reload 的访问令牌，请求需在 X-Reload-Token 头中给出；未设置时 /reload 不可用
+RELOAD_TOKEN = os.environ.get('NAV_RELOAD_TOKEN', '')
+
+
+@app.before_request
+def start_request_timing():
+    g.started = time.perf_counter()
+    metrics.begin_trace()
+    if profiler.enabled:
+        profiler.start()
+
+
+@app.after_request
+def remember_status(response):
+    g.status = response.status_code
+    return response
+
+
+# 在 teardown 中收尾：视图抛出异常时 after_request 不会执行，这里仍会执行，
+# 保证请求线程总会被移出采样、线程上的阶段计时总会被清除
+@app.teardown_request
+def record_request_timing(exc=None):
+    if 'started' not in g:
+        return
+    elapsed = time.perf_counter() - g.started
+    status = g.get('status', 500)
+    spans = metrics.end_trace()
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    metrics.observe_request(endpoint, request.method, status, elapsed)
+    if spans:
+        logger.debug('%s %s %d %.1f ms，各阶段: %s', request.method, endpoint, status, elapsed * 1000,
+                     ', '.join(f'{stage}={seconds * 1000:.2f}ms' for stage, seconds in spans.items()))
+    if profiler.enabled:
+        profile_path = profiler.finish(endpoint, elapsed * 1000)
+        if profile_path:
+            logger.warning('慢请求 %s %s 耗时 %.1f ms，采样结果已写入 %s', request.method, endpoint, elapsed * 1000,
+                           profile_path)
 
 
 @app.route('/')
@@ -16,13 +89,53 @@ def index():
     return render_template('index.html')
 
 
+_attraction_indexes = {}  # 索引类 -> 基于当前景点数据构建的索引
+
+
+def _current_index(index_class):
+    # 景点数据重新加载后（dataset.attractions 换成新对象）自动重建
+    attractions = dataset.attractions
+    index = _attraction_indexes.get(index_class)
+    if index is None or index.attractions is not attractions:
+        index = _attraction_indexes[index_class] = index_class(attractions)
+    return index
+
+
+def attraction_index():
+    """返回当前景点数据的名称索引"""
+    return _current_index(AttractionIndex)
+
+
+def spatial_index():
+    """返回当前景点数据的坐标网格索引"""
+    return _current_index(SpatialIndex)
+
+
+def preload():
+    """
+    在当前进程中加载全部数据、建好名称和坐标索引，再把现有对象移出垃圾回收的扫描范围（gc.freeze）。
+    gunicorn --preload 时在主进程中执行，fork 出的 worker 共享这些内存页：路线图和折线索引是只读数组，
+    其余对象不再被垃圾回收改写，只有各 worker 自己用到的对象才会被写时复制。
+    """
+    dataset.warm_up()
+    attraction_index().prefix_keys
+    spatial_index()
+    gc.freeze()
+
+
+if PRELOAD:
+    preload()
+elif WARM_UP:
+    dataset.start_warm_up()
+
+
 # 返回所有景点信息
 @app.route('/attractions', methods=['GET'])
 def get_attractions():
     attractions_list = [
-        {'name': attr.name, 'lat': float(attr.coordinates.split(',')[0]), 'lon': float(attr.coordinates.split(',')[1]),
+        {'name': attr.name, 'lat': attr.lat, 'lon': attr.lon,
          'description': attr.description}
-        for attr in attractions.values()
+        for attr in dataset.attractions.values()
     ]
     return jsonify(attractions_list)
 
@@ -30,7 +143,7 @@ def get_attractions():
 # 查询特定景点
 @app.route('/attractions/<string:name>', methods=['GET'])
 def get_attraction(name):
-    attraction = next((attr for attr in attractions.values() if name in attr.name), None)
+    attraction = attraction_index().find(name)
 
     if attraction:
         return jsonify({
@@ -39,70 +152,233 @@ def get_attraction(name):
             'description': attraction.description,
             'price': attraction.price,
             'link': attraction.link,
-            'lat': float(attraction.coordinates.split(',')[0]),
-            'lon': float(attraction.coordinates.split(',')[1]),
+            'lat': attraction.lat,
+            'lon': attraction.lon,
         })
     else:
         return jsonify({"message": "未找到该景点。"}), 404
 
 
-# 计算最优路径
-@app.route('/optimal_path', methods=['POST'])
-def optimal_path():
-    data = request.json
+def query_count(name, default, maximum=100):
+    # 解析正整数参数 ?name=，超过 maximum 时按 maximum 计，不是正整数时抛出 ValueError
+    count = int(request.args.get(name, default))
+    if count < 1:
+        raise ValueError
+    return min(count, maximum)
+
+
+# 景点名称自动补全：?q=关键字（支持名称前缀、包含和拼音前缀），可选 limit（默认 10，最多 100）
+@app.route('/attractions/search', methods=['GET'])
+def search_attractions():
+    try:
+        limit = query_count('limit', 10)
+    except ValueError:
+        return jsonify({'error': 'limit 必须是正整数'}), 400
+    results = attraction_index().search(request.args.get('q', ''), limit)
+    return jsonify([
+        {'name': attr.name, 'code': attr.code, 'lat': attr.lat, 'lon': attr.lon}
+        for attr in results
+    ])
+
+
+def nearby_response(results):
+    return jsonify([
+        {'name': attr.name, 'code': attr.code, 'lat': attr.lat, 'lon': attr.lon, 'distance': round(distance, 1)}
+        for attr, distance in results
+    ])
+
+
+def query_point():
+    # 解析 ?lat=&lon=，非法时抛出 ValueError
+    lat, lon = float(request.args['lat']), float(request.args['lon'])
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError
+    return lat, lon
+
+
+# 离给定 GPS 坐标最近的景点：?lat=&lon=，可选 n（默认 5，最多 100），结果附带距离（米）
+@app.route('/attractions/nearest', methods=['GET'])
+def nearest_attractions():
+    try:
+        lat, lon = query_point()
+        count = query_count('n', 5)
+    except (KeyError, ValueError):
+        return jsonify({'error': '需要合法的 lat、lon 坐标，n 必须是正整数'}), 400
+    return nearby_response(spatial_index().nearest(lat, lon, count))
+
+
+# 给定 GPS 坐标 radius 米范围内的景点：?lat=&lon=&radius=，按距离从近到远排列
+@app.route('/attractions/within', methods=['GET'])
+def attractions_within():
+    try:
+        lat, lon = query_point()
+        radius = float(request.args['radius'])
+        if not radius >= 0:
+            raise ValueError
+    except (KeyError, ValueError):
+        return jsonify({'error': '需要合法的 lat、lon 坐标和 radius（米）'}), 400
+    return nearby_response(spatial_index().within(lat, lon, radius))
+
+
+def route_leg(graph, road_key, start_code, end_code, tolerance=None, memo=None):
+    """
+    查找一段路线及其坐标：路线起点、折线（建索引时已转换为 WGS-84，可按缩放级别简化）、路线终点。
+
+    :param memo: 可选的字典，批量规划时在多个行程之间复用相同路段的结果
+    :return: (find_path 的结果, (N, 2) 的 (纬度, 经度) 坐标数组)
+    """
+    key = (road_key, start_code, end_code, tolerance)
+    if memo is not None and key in memo:
+        return memo[key]
+    with span('graph'):
+        path = find_path(graph, start_code, end_code)
+    origin, destination = path['coordinates']
+    with span('polylines'):
+        polylines_points = dataset.polylines.get(*road_key, start_code, end_code, tolerance=tolerance)
+    with span('coordinates'):
+        segment = np.vstack((
+            [[origin['lat'], origin['lon']]],
+            polylines_points[:, ::-1],
+            [[destination['lat'], destination['lon']]],
+        ))
+    if memo is not None:
+        memo[key] = (path, segment)
+    return path, segment
+
+
+# 支持的交通方式；fast 在步行、驾车和最快公交中取用时最短的一种，mixed 每一段分别选择
+ROUTE_MODES = ('walk', 'drive', 'bus', 'fast', 'mixed')
+
+
+def parse_route_request(data):
+    """
+    校验路线规划请求并解析参数：景点名称解析为编码，时间预算截断到上限，简化参数换算为容差（米），
+    优化目标统一为权重字典。缓存键由解析后的值构成（见 route_cache_key）。
+
+    :param data: 请求参数字典（start、end、midpoints、mode、busMode、solver、timeBudgetMs、objective、
+                 alternatives；mode 为 mixed 时可另传 switchPenalty；zoom 或 tolerance 用于简化折线）
+    :return: (参数字典, None)；请求不合法时为 (None, (错误响应字典, HTTP 状态码))
+    """
+    if not isinstance(data, dict):
+        return None, ({'error': '请求参数必须是 JSON 对象'}, 400)
     start_name = data.get('start')
     end_name = data.get('end')
     mode = data.get('mode')
-    midpoints_input = data.get('midpoints')
-    midpoints_names = midpoints_input if midpoints_input else []
+    midpoints_names = data.get('midpoints') or []
     bus_mode = data.get('busMode')  # 获取公交方案
-
-    start_code = None
-    end_code = None
-    mid_codes = []
-
-    for attr in attractions.values():
-        if attr.name == start_name:
-            start_code = attr.code
-        elif attr.name == end_name:
-            end_code = attr.code
-        elif attr.name in midpoints_names:
-            mid_codes.append(attr.code)
-
-    if not start_code or not end_code:
-        return jsonify({'error': '起点或终点景点不存在'}), 404
-
-    path_list = None
-    file_path = None
+    solver = data.get('solver') or 'auto'  # 求解方式：exact / heuristic / auto
+    if mode not in ROUTE_MODES:
+        return None, ({'error': '未知的交通方式'}, 400)
+    # 二者用作字典键，列表等不可哈希的值会在查找时抛出 TypeError
+    if bus_mode is not None and not isinstance(bus_mode, str):
+        return None, ({'error': '未知的公交方案'}, 400)
+    if not isinstance(solver, str):
+        return None, ({'error': '未知的求解方式'}, 400)
+    if not isinstance(midpoints_names, list):
+        return None, ({'error': 'midpoints 必须是景点名称列表'}, 400)
+    try:
+        budget_ms = time_budget(data)  # 启发式求解的时间预算（毫秒）
+    except (TypeError, ValueError):
+        return None, ({'error': 'timeBudgetMs 必须是正数'}, 400)
+    try:
+        tolerance = route_tolerance(data)
+    except (TypeError, ValueError):
+        return None, ({'error': '简化参数必须是有限的数字'}, 400)
+    try:
+        # 优化目标：distance / duration / cost / transfers、预设名或权重字典
+        weights = parse_objective(data.get('objective'))
+    except (TypeError, ValueError) as e:
+        return None, ({'error': str(e)}, 400)
+
+    # 名称逐个独立查找：起点和终点可以相同（环线），与起终点同名或重复的中间点只访问一次
+    with span('resolve'):
+        index = attraction_index()
+        start_code = index.code(start_name) if isinstance(start_name, str) else None
+        end_code = index.code(end_name) if isinstance(end_name, str) else None
+        if not start_code or not end_code:
+            return None, ({'error': '起点或终点景点不存在'}, 404)
+        mid_codes = []
+        for name in midpoints_names:
+            code = index.code(name) if isinstance(name, str) else None
+            if code is None:
+                return None, ({'error': f'中间点景点不存在: {name}'}, 404)
+            if code not in mid_codes and code not in (start_code, end_code):
+                mid_codes.append(code)
+
+    return {
+        'start_name': start_name,
+        'start_code': start_code,
+        'end_code': end_code,
+        'mid_codes': mid_codes,
+        'mode': mode,
+        # 混合出行默认使用最快的公交方案
+        'bus_mode': (bus_mode or 'quick') if mode == 'mixed' else bus_mode,
+        'solver': solver,
+        'budget_ms': budget_ms,
+        'tolerance': tolerance,
+        'weights': weights,
+        'switch_penalty': data.get('switchPenalty'),
+        'alternatives': bool(data.get('alternatives')),
+    }, None
+
+
+def plan_route(data, legs_memo=None):
+    """
+    计算一次路线规划请求：先由 parse_route_request 校验和解析参数，再由 solve_route 求解。
+
+    :param data: 请求参数字典，见 parse_route_request
+    :param legs_memo: 可选的路段缓存，见 route_leg
+    :return: (响应字典, HTTP 状态码)；成功时 segments 为各段的 (纬度, 经度) 坐标数组，由 render_route 输出
+    """
+    params, error = parse_route_request(data)
+    if error is not None:
+        return error
+    return solve_route(params, legs_memo)
+
+
+def solve_route(params, legs_memo=None):
+    """
+    按 parse_route_request 解析后的参数求解路线。
+
+    :param legs_memo: 可选的路段缓存，见 route_leg
+    :return: (响应字典, HTTP 状态码)，同 plan_route
+    """
+    attractions = dataset.attractions
+    start_name = params['start_name']
+    start_code = params['start_code']
+    end_code = params['end_code']
+    mid_codes = params['mid_codes']
+    mode = params['mode']
+    bus_mode = params['bus_mode']
+    solver = params['solver']
+    budget_ms = params['budget_ms']
+    tolerance = params['tolerance']
+    objective = params['weights']
+
+    graph = None
+    road_key = None
+    mixed_graphs = None
     bus_info = {}
 
-    if mode == 'walk':
-        path_list = walk_paths
-        file_path = 'data/walk_2.0.txt'
-        color_mode = mode
-    elif mode == 'drive':
-        path_list = drive_paths
-        file_path = 'data/drive_road.txt'
-        color_mode = mode
-    elif mode == 'bus':
-        color_mode = mode
-        if bus_mode == 'economic':
-            bus_paths = load_paths_v2('data/bus_eco.txt', attractions)
-            file_path = 'data/bus_road_eco.txt'
-        elif bus_mode == 'fewestTransfers':
-            bus_paths = load_paths_v2('data/bus_hc.txt', attractions)
-            file_path = 'data/bus_road_hc.txt'
-        elif bus_mode == 'fewestWalks':
-            bus_paths = load_paths_v2('data/bus_fw.txt', attractions)
-            file_path = 'data/bus_road_fw.txt'
-        elif bus_mode == 'quick':
-            bus_paths = load_paths_v2('data/bus_quick.txt', attractions)
-            file_path = 'data/bus_road_quick.txt'
-
-        path_list = bus_paths
-
-        for path in bus_paths:
-            if path.from_attraction.code == start_code and path.to_attraction.code == end_code:
+    with span('graph'):
+        if mode == 'walk':
+            graph = dataset.graph('walk')
+            road_key = ('walk', None)
+            color_mode = mode
+        elif mode == 'drive':
+            graph = dataset.graph('drive')
+            road_key = ('drive', None)
+            color_mode = mode
+        elif mode == 'bus':
+            color_mode = mode
+            try:
+                graph = dataset.graph('bus', bus_mode)
+            except KeyError:
+                return {'error': '未知的公交方案'}, 400
+            road_key = ('bus', bus_mode)
+
+            path = graph.get(start_code, end_code)
+            if path is not None:
                 bus_info = {
                     'taxi_cost': path.taxi_cost,
                     'bus_cost': path.bus_cost,
@@ -110,30 +386,57 @@ def optimal_path():
                     'bus_name': path.bus_name,
                     'huanchen': path.huanchen
                 }
-                break
-    elif mode == 'fast':
-        wp = find_fast_path(walk_paths, start_code, end_code)
-        dp = find_fast_path(drive_paths, start_code, end_code)
-        bp = find_fast_path(bus_paths1, start_code, end_code)
-        if wp is not None and (wp <= dp if dp is not None else True) and (wp <= bp if bp is not None else True):
-            path_list = walk_paths
-            file_path = 'data/walk_2.0.txt'
-            color_mode = 'walk'
-        elif dp is not None and (dp <= wp if wp is not None else True) and (dp <= bp if bp is not None else True):
-            path_list = drive_paths
-            file_path = 'data/drive_road.txt'
-            color_mode = 'drive'
-        elif bp is not None and (bp <= wp if wp is not None else True) and (bp <= dp if dp is not None else True):
-            path_list = bus_paths1
-            file_path = 'data/bus_road_quick.txt'
-            color_mode = 'bus'
-        else:
-            return jsonify({'error': '没有找到可用的路径'}), 404
-
-
-
-    best_path = calculate_distance(path_list, start_code, mid_codes, end_code)
-    print(best_path)
+        elif mode == 'fast':
+            walk_graph = dataset.graph('walk')
+            drive_graph = dataset.graph('drive')
+            bus_graph1 = dataset.graph('bus', 'quick')
+            wp = find_fast_path(walk_graph, start_code, end_code)
+            dp = find_fast_path(drive_graph, start_code, end_code)
+            bp = find_fast_path(bus_graph1, start_code, end_code)
+            if wp is not None and (wp <= dp if dp is not None else True) and (wp <= bp if bp is not None else True):
+                graph = walk_graph
+                road_key = ('walk', None)
+                color_mode = 'walk'
+            elif dp is not None and (dp <= wp if wp is not None else True) and (dp <= bp if bp is not None else True):
+                graph = drive_graph
+                road_key = ('drive', None)
+                color_mode = 'drive'
+            elif bp is not None and (bp <= wp if wp is not None else True) and (bp <= dp if dp is not None else True):
+                graph = bus_graph1
+                road_key = ('bus', 'quick')
+                color_mode = 'bus'
+            else:
+                return {'error': '没有找到可用的路径'}, 404
+        elif mode == 'mixed':
+            # 每一段在步行、驾车和公交（默认最快方案）中选择最优方式
+            color_mode = mode
+            bus_strategy = bus_mode
+            try:
+                mixed_graphs = {
+                    'walk': dataset.graph('walk'),
+                    'drive': dataset.graph('drive'),
+                    'bus': dataset.graph('bus', bus_strategy),
+                }
+            except KeyError:
+                return {'error': '未知的公交方案'}, 400
+            mixed_keys = {'walk': ('walk', None), 'drive': ('drive', None), 'bus': ('bus', bus_strategy)}
+
+    try:
+        with span('solve'):
+            if mixed_graphs is not None:
+                itinerary = plan_mixed_itinerary(mixed_graphs, start_code, mid_codes, end_code, solver, budget_ms,
+                                                 objective, params['switch_penalty'])
+                alternatives = None
+            else:
+                itinerary = plan_itinerary(graph, start_code, mid_codes, end_code, solver, budget_ms, objective)
+                # 可选：同一遍求解中给出最短、最快、最省钱、最少换乘等备选方案
+                alternatives = plan_alternatives(graph, start_code, mid_codes, end_code, solver, budget_ms) \
+                    if params['alternatives'] else None
+    except (TypeError, ValueError) as e:
+        return {'error': str(e)}, 400
+    except SolveCancelled:
+        return {'error': '请求已取消'}, 499
+    best_path = itinerary['order']
 
     # 还原景点名称顺序
     mp_names = []
@@ -144,65 +447,314 @@ def optimal_path():
         else:
             mp_names.append(None)  # 如果未找到，可以选择添加 None
 
-    print(mp_names)  # 打印还原的景点名称序列
+    logger.debug('访问顺序: %s %s', best_path, mp_names)
 
-    full_path = []
+    segments = []
+    legs = []
     total_duration = 0
     total_distance = 0
 
+    # 混合出行时每一段使用各自的路线图和折线
+    leg_modes = itinerary.get('modes') or [None] * len(best_path)
     current_start = start_code
-    for mid_code in best_path:
-        path = find_path(path_list, current_start, mid_code)
+    for mid_code, leg_mode in zip(best_path, leg_modes):
+        if leg_mode is not None:
+            graph = mixed_graphs[leg_mode]
+            road_key = mixed_keys[leg_mode]
+        path, segment = route_leg(graph, road_key, current_start, mid_code, tolerance, legs_memo)
+        segments.append(segment)
 
-        full_path.extend(path['coordinates'])
         total_duration += int(path['duration'])
         total_distance += int(path['distance'])
 
-        polylines_points = find_polylines_in_file(file_path, current_start, mid_code)
-        wgs84_coordinates = batch_gcj02_to_wgs84(polylines_points, coord_format="lon_lat")
-        data_to_insert = [{'lat': polyline[1], 'lon': polyline[0]} for polyline in wgs84_coordinates]
-
-        for point in data_to_insert:
-            full_path.insert(-1, point)
-
+        if leg_mode is not None:
+            legs.append({
+                'from': attractions[current_start].name,
+                'to': attractions[mid_code].name,
+                'mode': leg_mode,
+                'color': MODE_COLORS[leg_mode],
+                'distance': int(path['distance']),
+                'duration': int(path['duration']),
+            })
         current_start = mid_code
 
     response = {
-        'path': full_path,
+        'segments': segments,
         'duration': total_duration,
         'distance': total_distance,
         'waypoints': [start_name] + mp_names ,
-        'color': 'red' if color_mode == 'bus' else 'green' if color_mode == 'walk' else 'blue',
+        'color': MODE_COLORS.get(color_mode, 'purple'),
+        'solver': itinerary['solver'],
+        'gap': itinerary['gap'],
     }
 
     if bus_info:
         response.update(bus_info)  # 将公交信息添加到响应中
 
-    return jsonify(response)
-
+    if legs:
+        response['legs'] = legs  # 混合出行：每一段的交通方式，与 segments 一一对应
 
-
-def find_path(path_list, start, end):
-    for path in path_list:
-        if path.from_attraction.code == start and path.to_attraction.code == end:
-            return {
-                'from': path.from_attraction.name,
-                'to': path.to_attraction.name,
-                'coordinates': [
-                    {'lat': float(path.origin.split(',')[1]), 'lon': float(path.origin.split(',')[0])},
-                    {'lat': float(path.destination.split(',')[1]), 'lon': float(path.destination.split(',')[0])}
-                ],
-                'distance': path.distance,
-                'duration': path.duration,
-                'type': 'walk' if 'walk' in path_list else 'drive'
+    if alternatives is not None:
+        response['alternatives'] = [
+            {
+                'labels': alternative['labels'],
+                'waypoints': [start_name] + [attractions[code].name for code in alternative['order']],
+                **alternative['metrics'],
             }
+            for alternative in alternatives
+        ]
+
+    return response, 200
+
+
+def time_budget(data):
+    """
+    返回启发式求解的时间预算（毫秒）：请求中的 timeBudgetMs，超过 MAX_BUDGET_MS 时截断；未给出时返回 None。
+
+    :raises ValueError: 不是有限的正数
+    """
+    if data.get('timeBudgetMs') is None:
+        return None
+    budget_ms = float(data['timeBudgetMs'])
+    if not math.isfinite(budget_ms) or budget_ms <= 0:
+        raise ValueError(f"时间预算必须是有限的正数: {budget_ms}")
+    return min(budget_ms, MAX_BUDGET_MS)
+
+
+def route_tolerance(data):
+    """
+    返回折线简化容差（米）：优先使用 tolerance，否则按地图缩放级别 zoom 换算，都没有时不简化。
+
+    :raises ValueError: 参数不是有限的数字（NaN 的容差会去掉包括端点在内的所有点，inf 的缩放级别无法取整）
+    """
+    for name in ('tolerance', 'zoom'):
+        if data.get(name) is not None:
+            value = float(data[name])
+            if not math.isfinite(value):
+                raise ValueError(f"{name} 必须是有限的数字: {value}")
+            return value if name == 'tolerance' else zoom_tolerance(value)
     return None
 
-def find_fast_path(path_list, start, end):
-    for path in path_list:
-        if path.from_attraction.code == start and path.to_attraction.code == end:
-            return int(path.duration)
-    return None
+
+def render_route(response, fmt='json'):
+    """
+    把 plan_route 的结果序列化为指定格式：
+    json 为每个点一个 {'lat', 'lon'} 对象的 path（混合出行的 legs 带 pathStart / pathEnd 下标）；
+    polyline 把 path 换成每段一条 Google encoded polyline 的 polylines 列表；
+    binary 见 route_codec.pack_route。
+
+    :return: (响应体, MIME 类型)
+    """
+    meta = {key: value for key, value in response.items() if key != 'segments'}
+    segments = response['segments']
+    if fmt == 'binary':
+        return pack_route(meta, segments), FORMAT_MIMETYPES[fmt]
+    if fmt == 'polyline':
+        meta['polylines'] = [encode_polyline(segment) for segment in segments]
+        return app.json.dumps(meta), FORMAT_MIMETYPES[fmt]
+
+    path = []
+    for index, segment in enumerate(segments):
+        if 'legs' in meta:
+            meta['legs'][index] = dict(meta['legs'][index], pathStart=len(path), pathEnd=len(path) + len(segment))
+        path.extend({'lat': lat, 'lon': lon} for lat, lon in segment.tolist())
+    return app.json.dumps({'path': path, **meta}), FORMAT_MIMETYPES[fmt]
+
+
+def route_format():
+    """
+    确定响应格式：查询参数 format 优先，其次按 Accept 头选择，默认 json。
+
+    :raises ValueError: format 参数未知
+    """
+    fmt = request.args.get('format')
+    if fmt is not None:
+        if fmt not in FORMAT_MIMETYPES:
+            raise ValueError(f"未知的响应格式: {fmt}")
+        return fmt
+    best = request.accept_mimetypes.best_match(list(FORMAT_MIMETYPES.values()), default=FORMAT_MIMETYPES['json'])
+    return next(name for name, mimetype in FORMAT_MIMETYPES.items() if mimetype == best)
+
+
+def route_cache_key(params, fmt='json'):
+    # 由 parse_route_request 解析后的参数构成，等价的请求（如 tolerance 为 5 和 5.0、按 zoom 换算出相同容差、
+    # 目标名与同义的预设）共用同一条缓存；中间点顺序不影响结果，排序后作为键；
+    # 不使用公交的方式忽略 busMode，非混合出行忽略 switchPenalty
+    mode = params['mode']
+    return (
+        fmt,
+        params['start_code'],
+        params['end_code'],
+        tuple(sorted(params['mid_codes'])),
+        mode,
+        params['bus_mode'] if mode in ('bus', 'mixed') else None,
+        json.dumps(params['switch_penalty'], sort_keys=True) if mode == 'mixed' else None,
+        params['solver'],
+        params['budget_ms'],
+        tuple(sorted(params['weights'].items())),
+        params['alternatives'],
+        params['tolerance'],
+    )
+
+
+# 计算最优路径（相同请求直接返回缓存的序列化结果）；?format=polyline / binary 或 Accept 头可选紧凑格式
+@app.route('/optimal_path', methods=['POST'])
+def optimal_path():
+    data = request.json
+    try:
+        fmt = route_format()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    params, error = parse_route_request(data)
+    if error is not None:
+        response, status = error
+        return jsonify(response), status
+    key = route_cache_key(params, fmt)
+    cached = route_cache.get(key)
+    if cached is None:
+        response, status = solve_route(params)
+        if status != 200:
+            return jsonify(response), status
+        with span('serialize'):
+            cached = render_route(response, fmt)
+        route_cache.set(key, cached)
+    body, mimetype = cached
+    return app.response_class(body, mimetype=mimetype)
+
+
+def plan_batch(trips, fmt, cancel=None):
+    """
+    批量规划，按完成顺序逐行产出 NDJSON：{"index": 行程下标, "status": 状态码, "result": 结果}。
+    相同的行程只计算一次，路段和折线在所有行程之间复用；
+    行程在 executors.batch_pool 中并行计算，求解仍按规模交给求解进程池。
+    """
+    legs_memo = {}
+
+    def solve(key, params):
+        # 响应头在第一行之前就已发出，单个行程的异常不能中断整个流，只在该行程的那一行中报告
+        try:
+            return solve_trip(key, params)
+        except (TypeError, ValueError) as e:
+            return 400, json.dumps({'error': str(e)})
+        except SolveCancelled:
+            raise
+        except Exception:
+            logger.exception('批量规划中的行程求解失败')
+            return 500, json.dumps({'error': '行程求解失败'})
+
+    def solve_trip(key, params):
+        cached = route_cache.get(key)
+        if cached is None:
+            # 每个行程的各阶段耗时单独汇总
+            metrics.begin_trace()
+            try:
+                response, status = solve_route(params, legs_memo)
+                if status != 200:
+                    return status, app.json.dumps(response)
+                with span('serialize'):
+                    cached = render_route(response, fmt)
+            finally:
+                metrics.end_trace()
+            route_cache.set(key, cached)
+        return 200, cached[0]
+
+    groups = {}  # 行程键 -> 请求中所有相同行程的下标
+    unique = []
+    for index, trip in enumerate(trips):
+        if not isinstance(trip, dict):
+            yield json.dumps({'index': index, 'status': 400, 'result': {'error': '行程必须是对象'}}) + '\n'
+            continue
+        try:
+            params, error = parse_route_request(trip)
+            key = route_cache_key(params, fmt) if error is None else None
+        except (TypeError, ValueError) as e:
+            error = {'error': str(e)}, 400
+        if error is not None:
+            response, status = error
+            yield json.dumps({'index': index, 'status': status, 'result': response}) + '\n'
+            continue
+        if key not in groups:
+            groups[key] = []
+            unique.append((key, params))
+        groups[key].append(index)
+
+    futures = [executors.batch_pool.submit(executors.call_with_cancel, cancel, solve, key, params)
+               for key, params in unique]
+    try:
+        for position, (status, body) in executors.iter_solver_results(futures, cancel):
+            for index in groups[unique[position][0]]:
+                yield f'{{"index": {index}, "status": {status}, "result": {body}}}\n'
+    except SolveCancelled:
+        return
+
+
+# 批量规划：请求体为 {"trips": [与 /optimal_path 相同的参数, ...]}，结果按完成顺序以 NDJSON 流式返回
+@app.route('/optimal_path/batch', methods=['POST'])
+def optimal_path_batch():
+    data = request.json
+    trips = data.get('trips') if isinstance(data, dict) else None
+    if not isinstance(trips, list):
+        return jsonify({'error': 'trips 必须是行程列表'}), 400
+    fmt = request.args.get('format', 'json')
+    if fmt not in ('json', 'polyline'):
+        return jsonify({'error': f'批量规划不支持的响应格式: {fmt}'}), 400
+    cancel = executors.current_cancel()
+    return app.response_class(plan_batch(trips, fmt, cancel), mimetype='application/x-ndjson')
+
+
+# 路线缓存命中情况
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(route_cache.stats())
+
+# 进程内存指标名 -> (metrics.process_memory() 中的字段, 说明)
+MEMORY_METRICS = {
+    'nav_process_resident_bytes': ('rss', '进程常驻内存（字节），含与其他 worker 共享的页'),
+    'nav_process_proportional_bytes': ('pss', '按共享进程数分摊后的内存（字节），各 worker 相加即为总占用'),
+    'nav_process_private_bytes': ('private', '本进程独占的内存（字节），fork 后被写时复制的页计入这里'),
+}
+
+
+# Prometheus 指标：请求耗时直方图、各阶段耗时直方图、路线缓存命中情况和当前 worker 的内存占用
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    stats = route_cache.stats()
+    memory = metrics.process_memory()
+    body = metrics.render(
+        metrics.scalar('nav_route_cache_hits_total', '路线缓存命中次数', stats['hits'], 'counter'),
+        metrics.scalar('nav_route_cache_misses_total', '路线缓存未命中次数', stats['misses'], 'counter'),
+        metrics.scalar('nav_route_cache_hit_ratio', '路线缓存命中率', stats['hit_rate']),
+        metrics.scalar('nav_route_cache_entries', '路线缓存条目数', stats['size']),
+        *(metrics.scalar(name, help_text, memory[field])
+          for name, (field, help_text) in MEMORY_METRICS.items() if field in memory),
+    )
+    return app.response_class(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# 就绪检查：预热完成（或未启用预热）时返回 200，否则返回 503；同时列出已加载的数据
+@app.route('/ready', methods=['GET'])
+def readiness():
+    status = dataset.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+
+# 数据文件更新后重新加载，无需重启服务；需要 NAV_RELOAD_TOKEN 令牌，?force=1 时即使文件未变化也重新加载
+@app.route('/reload', methods=['POST'])
+def reload_data():
+    if not RELOAD_TOKEN:
+        return jsonify({'error': '未设置 NAV_RELOAD_TOKEN，重新加载不可用'}), 403
+    token = request.headers.get('X-Reload-Token', '')
+    if not hmac.compare_digest(token.encode('utf-8'), RELOAD_TOKEN.encode('utf-8')):
+        return jsonify({'error': '重新加载令牌无效'}), 403
+    force = request.args.get('force', '').lower() in ('1', 'true', 'yes')
+    reloaded = dataset.reload(force=force)
+    if reloaded:
+        route_cache.clear()
+        executors.clear_shared_matrices()
+        if WARM_UP:
+            dataset.start_warm_up()
+    return jsonify({'reloaded': reloaded})
+
 
 if __name__ == '__main__':
     app.run(debug=True)
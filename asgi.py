@@ -0,0 +1,115 @@
+"""
+ASGI 入口：uvicorn asgi:application
+
+与 app.py 提供相同的路由。每个请求在 executors.io_pool 的线程中执行 Flask 应用，
+文件和数据库读取不会阻塞事件循环；路线求解交给求解进程池，耗时的多点规划不会占住
+处理 /attractions 等轻量请求的线程。客户端断开后，该请求尚未完成的求解任务会被取消。
+"""
+import asyncio
+import io
+import sys
+import threading
+
+import executors
+from app import app
+
+executors.enable_solver_pool()
+
+
+def _build_environ(scope, body):
+    # 按 PEP 3333 由 ASGI scope 构造 WSGI environ
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+        'wsgi.input_terminated': True,  # 请求体已完整读入，读到末尾即结束（分块传输时 Werkzeug 依赖此项）
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'CONTENT_LENGTH':
+            continue  # 以实际收到的请求体长度为准，见下
+        else:
+            key = f'HTTP_{name}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    # 分块传输或 HTTP/2 的请求没有 Content-Length 头，不设置时 Flask 会把请求体当作空的
+    environ['CONTENT_LENGTH'] = str(len(body))
+    return environ
+
+
+async def _serve_http(scope, receive, send):
+    body = b''
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            break
+
+    loop = asyncio.get_running_loop()
+    started = {}
+    cancelled = threading.Event()
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        cancelled.set()
+
+    watcher = asyncio.create_task(watch_disconnect())
+
+    def start_response(status, headers, exc_info=None):
+        started['status'] = int(status.split(' ', 1)[0])
+        started['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+        return lambda data: None  # 不支持 write()，Flask 不会用到
+
+    # 应用本身和响应体的每一块都在线程池中生成，流式响应可以边生成边发送
+    def run(fn, *args):
+        return loop.run_in_executor(executors.io_pool, executors.call_with_cancel, cancelled, fn, *args)
+
+    chunks = None
+    try:
+        chunks = await run(app.wsgi_app, _build_environ(scope, body), start_response)
+        iterator = iter(chunks)
+        await send({'type': 'http.response.start', 'status': started['status'], 'headers': started['headers']})
+        while not cancelled.is_set():
+            chunk = await run(next, iterator, None)
+            if chunk is None:
+                break
+            if chunk:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        watcher.cancel()
+        if hasattr(chunks, 'close'):
+            await run(chunks.close)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http':
+        await _serve_http(scope, receive, send)
+    elif scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                executors.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
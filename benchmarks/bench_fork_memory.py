@@ -0,0 +1,144 @@
+"""
+多 worker 部署的内存基准：在主进程中加载全部路线数据后 fork 出若干 worker（与 gunicorn --preload 相同），
+每个 worker 执行一轮覆盖全部路线的查找并做一次完整的垃圾回收，然后报告各自的 RSS、PSS 和独占内存。
+
+对比三种方式：
+    objects         路线图为 Path 对象（默认）
+    objects+freeze  同上，fork 前调用 gc.freeze()
+    frozen          路线图和折线索引为只读 NumPy 数组（NAV_PRELOAD=1 时的方式），fork 前调用 gc.freeze()
+
+独占内存（Private）即 fork 后被写时复制到各 worker 中的部分；全部进程的 PSS 之和为实际占用的物理内存。
+只能在 Linux 上运行（依赖 os.fork 和 /proc/self/smaps_rollup）。
+
+用法（在仓库根目录执行）：python benchmarks/bench_fork_memory.py [--attractions 1000] [--workers 4]
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic  # noqa: E402
+from metrics import process_memory  # noqa: E402
+
+VARIANTS = ('objects', 'objects+freeze', 'frozen')
+
+
+def workload(dataset, seed):
+    # 模拟长时间运行的 worker：每条路线至少查找一次，每个路线图生成若干代价矩阵，最后做一次完整的垃圾回收
+    rng = random.Random(seed)
+    for mode, strategy in dataset.path_files:
+        graph = dataset.graph(mode, strategy)
+        codes = sorted(graph.codes())
+        for path in graph:
+            graph.get(path.from_attraction.code, path.to_attraction.code)
+        for _ in range(20):
+            graph.matrix(rng.sample(codes, min(len(codes), 22)))
+    for key in list(dataset.polylines.routes)[::50]:
+        dataset.polylines.get(*key.split('|'))
+    gc.collect()
+
+
+def run_variant(variant, workdir, workers):
+    """在当前进程中加载数据并 fork 出 workers 个 worker，返回主进程和各 worker 的内存占用"""
+    os.chdir(workdir)
+    from dataset import Dataset
+    dataset = Dataset(frozen=variant == 'frozen')
+    dataset.warm_up()
+    gc.collect()
+    if variant != 'objects':
+        gc.freeze()
+    master = process_memory()
+
+    # worker 报告后阻塞在 release 管道上，直到主进程读完全部进程的 PSS 后关闭写端，保证测量时所有 worker 都还活着
+    release_read, release_write = os.pipe()
+    results = []
+    for index in range(workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            os.close(release_write)
+            workload(dataset, index)
+            with os.fdopen(write_fd, 'w') as out:
+                json.dump(process_memory(), out)
+            os.read(release_read, 1)
+            os._exit(0)
+        os.close(write_fd)
+        results.append((pid, read_fd))
+    os.close(release_read)
+
+    memory = []
+    for pid, read_fd in results:
+        with os.fdopen(read_fd) as file:
+            memory.append(json.load(file))
+    # 所有 worker 都报告完后重新读取各进程的 PSS，此时共享页已在全部进程之间分摊
+    pss = [_pss(pid) for pid, _ in results]
+    master_pss = process_memory().get('pss', 0)
+    os.close(release_write)
+    for pid, _ in results:
+        os.waitpid(pid, 0)
+    return {'master': master, 'master_pss': master_pss, 'workers': memory, 'worker_pss': pss}
+
+
+def _pss(pid):
+    try:
+        with open(f'/proc/{pid}/smaps_rollup', 'r') as file:
+            for line in file:
+                if line.startswith('Pss:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def _mb(value):
+    return f"{value / 2 ** 20:8.1f}"
+
+
+def report(variant, result):
+    workers = result['workers']
+    count = len(workers)
+    private = sum(worker['private'] for worker in workers) / count
+    rss = sum(worker['rss'] for worker in workers) / count
+    total = result['master_pss'] + sum(result['worker_pss'])
+    print(f"{variant:15s} 主进程 RSS {_mb(result['master']['rss'])} MB | worker 平均 RSS {_mb(rss)} MB, "
+          f"独占 {_mb(private)} MB | {count} 个 worker 合计 PSS {_mb(total)} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--attractions', type=int, default=1000, help='合成数据的景点数')
+    parser.add_argument('--workers', type=int, default=4, help='fork 的 worker 数')
+    parser.add_argument('--variant', choices=VARIANTS, help=argparse.SUPPRESS)  # 内部使用：在子进程中运行一种方式
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.variant:
+        json.dump(run_variant(args.variant, args.workdir, args.workers), sys.stdout)
+        return
+    if not hasattr(os, 'fork') or not process_memory():
+        sys.exit('需要 Linux（os.fork 和 /proc/self/smaps_rollup）')
+
+    with tempfile.TemporaryDirectory(prefix='nav-fork-') as workdir:
+        synthetic.write_dataset(workdir, args.attractions, road_points=4)
+        print(f"{args.attractions} 个景点，{args.workers} 个 worker")
+        for variant in VARIANTS:
+            # 每种方式在新的解释器中运行，互不影响；第一次运行会生成快照，先单独跑一遍
+            command = [sys.executable, os.path.abspath(__file__), '--variant', variant, '--workdir', workdir,
+                       '--workers', '0']
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+            command[-1] = str(args.workers)
+            output = subprocess.run(command, check=True, stdout=subprocess.PIPE, text=True).stdout
+            report(variant, json.loads(output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+路线模型内存基准：对比改造前（实例 __dict__ + 字符串字段）与当前 __slots__ + 数值字段的单条路线内存占用。
+
+用法（在仓库根目录执行）：python benchmarks/bench_models_memory.py [路线条数]
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Attraction, BusPath  # noqa: E402
+
+
+class LegacyBusPath:
+    # 改造前的 BusPath：普通类，坐标和费用等字段均为字符串
+    def __init__(self, from_attraction, to_attraction, origin, destination, distance, duration, taxi_cost, bus_cost,
+                 walking_distance, bus_name, huanchen):
+        self.from_attraction = from_attraction
+        self.to_attraction = to_attraction
+        self.origin = origin
+        self.destination = destination
+        self.distance = distance
+        self.duration = duration
+        self.taxi_cost = taxi_cost
+        self.bus_cost = bus_cost
+        self.walking_distance = walking_distance
+        self.bus_name = bus_name
+        self.huanchen = huanchen
+
+
+def _raw_edge(i):
+    lon, lat = 108.9 + i * 1e-6, 34.2 + i * 1e-6
+    return (f"{lon:.6f},{lat:.6f}", f"{lat:.6f},{lon:.6f}", str(1000 + i), str(600 + i), str(i % 50),
+            f"{i % 4}.0", str(i % 900), f"{i % 300}路", str(i % 3))
+
+
+def build_legacy(count, a, b):
+    edges = []
+    for i in range(count):
+        origin, destination, distance, duration, taxi, bus, walk, name, transfers = _raw_edge(i)
+        edges.append(LegacyBusPath(a, b, origin, destination, distance, duration, taxi, bus, walk, name, transfers))
+    return edges
+
+
+def build_slotted(count, a, b):
+    edges = []
+    for i in range(count):
+        origin, destination, distance, duration, taxi, bus, walk, name, transfers = _raw_edge(i)
+        origin = tuple(map(float, origin.split(',')))
+        destination = tuple(map(float, destination.split(',')))
+        edges.append(BusPath(a, b, origin, destination, distance, duration, taxi, bus, walk, name, transfers))
+    return edges
+
+
+def measure(build, count, a, b):
+    tracemalloc.start()
+    edges = build(count, a, b)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del edges
+    return current
+
+
+def main(count=10000):
+    a = Attraction('A', 'JD001', (34.2, 108.9), '')
+    b = Attraction('B', 'JD002', (34.3, 109.0), '')
+    legacy = measure(build_legacy, count, a, b)
+    slotted = measure(build_slotted, count, a, b)
+    print(f"路线条数: {count}")
+    print(f"改造前: {legacy / 1024:.1f} KiB  ({legacy / count:.0f} B/条)")
+    print(f"当前:   {slotted / 1024:.1f} KiB  ({slotted / count:.0f} B/条)  (节省 {1 - slotted / legacy:.0%})")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,105 @@
+"""
+路线文件解析基准：对比改造前的整行正则加载（load_paths / load_paths_v2）与当前的流式解析器，
+并统计两者各自加载和丢弃的行数。另用合成的长公交线路名称检查两者的耗时随行长的变化。
+
+用法（在仓库根目录执行）：python benchmarks/bench_route_parser.py [路线文件 ...]
+不指定文件时使用 data/drive.txt 和 data/bus_quick.txt，文件不存在时改用合成数据。
+"""
+import os
+import re
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic  # noqa: E402
+from functions import load_attractions, load_paths, load_paths_v2  # noqa: E402
+from route_parser import parse_route_line  # noqa: E402
+
+DEFAULT_FILES = ('data/drive.txt', 'data/bus_quick.txt')
+
+# 改造前 load_paths / load_paths_v2 使用的正则
+LEGACY_PATH_PATTERN = re.compile(
+    r"(.+)\((.+)\) to (.+)\((.+)\), \{'origin': '(.+)', 'destination': '(.+)', 'distance': '(\d+)', "
+    r"'duration': '(\d+)', 'strategy': (.+)\}")
+LEGACY_BUS_PATTERN = re.compile(
+    r"(.+)\((.+)\) to (.+)\((.+)\), \{'origin': '(.+)', 'destination': '(.+)', 'distance': '(\d+)', "
+    r"'duration': '(\d+)', 'taxi_cost': '(\d+)', 'bus_cost': '([\d.]+)', 'walking_distance': '(\d+)', "
+    r"'bus_name': '(.+)', 'huanchen': (\d+)\}")
+
+
+def legacy_match_lines(lines, pattern):
+    # 改造前的逐行匹配，返回匹配成功的行数
+    return sum(1 for line in lines if pattern.match(line.strip()))
+
+
+def parse_lines(lines):
+    # 当前的流式解析，返回解析成功的行数
+    parsed = 0
+    for line_no, line in enumerate(lines, 1):
+        try:
+            parse_route_line(line, line_no)
+            parsed += 1
+        except ValueError:
+            pass
+    return parsed
+
+
+def is_bus_file(file_path):
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return "'bus_name'" in file.readline()
+
+
+def bench_file(file_path, repeat):
+    with open(file_path, 'r', encoding='utf-8') as file:
+        lines = [line for line in file if line.strip()]
+    bus = is_bus_file(file_path)
+    pattern = LEGACY_BUS_PATTERN if bus else LEGACY_PATH_PATTERN
+    loader = load_paths_v2 if bus else load_paths
+
+    # 完整加载需要同目录下的景点文件
+    attractions_file = os.path.join(os.path.dirname(file_path), 'attractions_summary.txt')
+    attractions = load_attractions(attractions_file) if os.path.exists(attractions_file) else {}
+
+    legacy_matched = legacy_match_lines(lines, pattern)
+    parsed = parse_lines(lines)
+    legacy = min(timeit.repeat(lambda: legacy_match_lines(lines, pattern), number=1, repeat=repeat))
+    current = min(timeit.repeat(lambda: parse_lines(lines), number=1, repeat=repeat))
+    load = min(timeit.repeat(lambda: loader(file_path, attractions), number=1, repeat=repeat))
+
+    print(f"{file_path}: {len(lines)} 行")
+    print(f"  整行正则:   {legacy * 1000:8.2f} ms  识别 {legacy_matched} 行，静默丢弃 {len(lines) - legacy_matched} 行")
+    print(f"  流式解析:   {current * 1000:8.2f} ms  识别 {parsed} 行  (加速 {legacy / current:.2f}x)")
+    print(f"  {loader.__name__} 完整加载（含坐标转换和建对象）: {load * 1000:.2f} ms，{len(attractions)} 个景点")
+
+
+def bench_line_length(repeat):
+    # 同一行逐步加长 bus_name，整行正则的回溯随行长增加，流式解析基本不变
+    attractions = synthetic.make_attractions(2)
+    base = synthetic.path_line(attractions[0], attractions[1], 'bus').strip()
+    name = base.split("'bus_name': '")[1].split("'")[0]
+    print("\n按行长：")
+    for copies in (1, 5, 20, 50):
+        line = base.replace(name, '--'.join([name] * copies))
+        legacy = min(timeit.repeat(lambda: LEGACY_BUS_PATTERN.match(line), number=200, repeat=repeat)) / 200
+        current = min(timeit.repeat(lambda: parse_route_line(line), number=200, repeat=repeat)) / 200
+        print(f"  {len(line):5d} 字符: 整行正则 {legacy * 1e6:8.1f} us, 流式解析 {current * 1e6:6.1f} us")
+
+
+def main(files, repeat=5):
+    if not files:
+        files = [path for path in DEFAULT_FILES if os.path.exists(path)]
+    with tempfile.TemporaryDirectory(prefix='nav-parser-') as workdir:
+        if not files:
+            print("未找到 data/ 中的路线文件，使用 1000 个景点的合成数据")
+            synthetic.write_dataset(workdir, 1000, road_points=2)
+            files = [os.path.join(workdir, 'data', name) for name in ('drive.txt', 'bus_quick.txt')]
+        for file_path in files:
+            bench_file(file_path, repeat)
+    bench_line_length(repeat)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,269 @@
+"""
+基准测试套件：用合成数据（见 synthetic.py）测量各加载、查找、转换和求解函数，
+并通过 Flask 测试客户端对 /optimal_path 做端到端压测。结果写入 JSON，可与保存的基线比较。
+
+用法（在仓库根目录执行）：
+    python benchmarks/bench_suite.py                      # 运行全部基准，与 benchmarks/baseline.json 比较（存在时）
+    python benchmarks/bench_suite.py --quick              # 缩小规模，用于快速检查
+    python benchmarks/bench_suite.py --save-baseline      # 把本次结果保存为基线
+    python benchmarks/bench_suite.py --filter load_paths  # 只运行名称包含 load_paths 的基准
+
+基线与机器相关，应在同一台机器上保存和比较。中位数比基线慢 --threshold 倍以上的项视为回归，
+此时退出码为 1。
+"""
+import argparse
+import ast
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic  # noqa: E402
+from functions import calculate_distance, load_attractions, load_paths, load_paths_v2  # noqa: E402
+from graph import RouteGraph  # noqa: E402
+from polyline_store import open_polyline_store  # noqa: E402
+from ToGPS import batch_gcj02_to_wgs84  # noqa: E402
+
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+OUTPUT_PATH = os.path.join(ROOT, 'benchmarks', 'results.json')
+
+# 景点数和中间点数的规模
+SIZES = (10, 100, 1000)
+STOPS = (2, 5, 10, 20)
+QUICK_SIZES = (10, 100)
+QUICK_STOPS = (2, 10)
+# 每个坐标转换基准的点数 = 景点数 * POINTS_PER_ATTRACTION
+POINTS_PER_ATTRACTION = 100
+
+
+def find_polylines_in_file(file_path, start_code, end_code):
+    """
+    旧的折线查找方式，作为 PolylineStore.get 的对照基线：每次查找都逐行扫描并解析 road.txt，
+    返回起点和终点匹配的路线的 polylines 坐标列表，没有找到时返回空列表。
+    """
+    with open(file_path, 'r') as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                road_data = ast.literal_eval(line)
+                if road_data.get('origin').strip() == start_code and road_data.get('destination').strip() == end_code:
+                    return [tuple(map(float, point.split(','))) for polyline in road_data.get('polylines', [])
+                            for point in polyline.split(';')]
+            except Exception:
+                pass  # 解析失败时忽略该行并继续
+    return []
+
+
+def summarize(times, loops=1):
+    """把单次耗时列表（秒）汇总为毫秒统计"""
+    times = sorted(times)
+    return {
+        'min_ms': times[0] * 1000,
+        'median_ms': statistics.median(times) * 1000,
+        'mean_ms': statistics.fmean(times) * 1000,
+        'p95_ms': times[min(len(times) - 1, int(len(times) * 0.95))] * 1000,
+        'runs': len(times),
+        'loops': loops,
+    }
+
+
+def measure(fn, repeat):
+    """重复 repeat 轮，每轮自动选择循环次数使其至少运行 0.2 秒，返回单次调用的统计"""
+    timer = timeit.Timer(fn)
+    loops, _ = timer.autorange()
+    return summarize([total / loops for total in timer.repeat(repeat=repeat, number=loops)], loops)
+
+
+class Suite:
+    def __init__(self, name_filter=None):
+        self.name_filter = name_filter
+        self.results = {}
+
+    def wanted(self, name):
+        return not self.name_filter or self.name_filter in name
+
+    def record(self, name, stats, **params):
+        stats = dict(params=params, **stats)
+        self.results[name] = stats
+        print(f"{name:<48} 中位数 {stats['median_ms']:10.3f} ms   最小 {stats['min_ms']:10.3f} ms")
+
+    def bench(self, name, fn, repeat, **params):
+        if self.wanted(name):
+            self.record(name, measure(fn, repeat), **params)
+
+
+def micro_benchmarks(suite, workdir, sizes, stops, repeat):
+    """各函数的微基准；返回 {景点数: 数据目录}，供端到端测试复用"""
+    directories = {}
+    for count in sizes:
+        directory = directories[count] = os.path.join(workdir, f'poi{count}')
+        attractions = synthetic.write_dataset(directory, count)
+        data = os.path.join(directory, 'data')
+        loaded = load_attractions(os.path.join(data, 'attractions_summary.txt'))
+        suite.bench(f'load_attractions[poi={count}]',
+                    lambda: load_attractions(os.path.join(data, 'attractions_summary.txt')), repeat, attractions=count)
+        suite.bench(f'load_paths[poi={count}]',
+                    lambda: load_paths(os.path.join(data, 'walk.txt'), loaded), repeat, attractions=count)
+        suite.bench(f'load_paths_v2[poi={count}]',
+                    lambda: load_paths_v2(os.path.join(data, 'bus_eco.txt'), loaded), repeat, attractions=count)
+        # 查找文件中最后一条路线，即逐行扫描的最坏情况；与预编译索引的查找对比
+        last = synthetic.make_edges(count)[-1]
+        start, end = attractions[last[0]][1], attractions[last[1]][1]
+        suite.bench(f'find_polylines_in_file[poi={count}]',
+                    lambda: find_polylines_in_file(os.path.join(data, 'walk_2.0.txt'), start, end), repeat,
+                    attractions=count)
+        store = open_polyline_store({('walk', None): os.path.join(data, 'walk_2.0.txt')},
+                                    os.path.join(data, 'polylines.bin'), os.path.join(data, 'polylines.idx.json'),
+                                    os.path.join(data, 'polylines.lod.bin'))
+        suite.bench(f'polyline_store_get[poi={count}]',
+                    lambda: store.get('walk', None, start, end), repeat, attractions=count)
+        points = synthetic.make_gcj02_points(count * POINTS_PER_ATTRACTION)
+        point_list = [tuple(point) for point in points.tolist()]
+        suite.bench(f'batch_gcj02_to_wgs84[points={len(points)}]',
+                    lambda: batch_gcj02_to_wgs84(point_list), repeat, points=len(points))
+
+    # 求解只与站点数有关，使用最大的数据集
+    count = max(sizes)
+    data = os.path.join(directories[count], 'data')
+    attractions = load_attractions(os.path.join(data, 'attractions_summary.txt'))
+    graph = RouteGraph(load_paths(os.path.join(data, 'walk.txt'), attractions), 'walk')
+    codes = list(attractions)
+    for stop_count in stops:
+        mids = codes[2:2 + stop_count]
+        suite.bench(f'calculate_distance[stops={stop_count}]',
+                    lambda: calculate_distance(graph, codes[0], mids, codes[1]), repeat, stops=stop_count)
+    return directories
+
+
+def endpoint_benchmarks(suite, directories, stops, requests_per_case, seed=0):
+    """通过 Flask 测试客户端压测 /optimal_path；每个请求的站点不同，并在请求前清空响应缓存"""
+    import app as app_module
+    from dataset import Dataset
+
+    client = app_module.app.test_client()
+    cwd = os.getcwd()
+    try:
+        for count, directory in directories.items():
+            names = [attraction[0] for attraction in synthetic.make_attractions(count)][:synthetic.STOP_POOL]
+            cases = [stop_count for stop_count in stops if stop_count + 2 <= len(names)]
+            if not any(suite.wanted(f'optimal_path[poi={count},stops={s}]') for s in cases) and \
+                    not suite.wanted(f'dataset_load[poi={count}]'):
+                continue
+            os.chdir(directory)
+            app_module.dataset = Dataset()
+            app_module.route_cache.clear()
+            # 首次访问时解析文本、构建折线索引并写快照
+            started = time.perf_counter()
+            app_module.dataset.attractions
+            app_module.dataset.polylines
+            if suite.wanted(f'dataset_load[poi={count}]'):
+                suite.record(f'dataset_load[poi={count}]', summarize([time.perf_counter() - started]),
+                             attractions=count)
+            rng = random.Random(seed)
+            for stop_count in cases:
+                name = f'optimal_path[poi={count},stops={stop_count}]'
+                if not suite.wanted(name):
+                    continue
+                times = []
+                for _ in range(requests_per_case):
+                    chosen = rng.sample(names, stop_count + 2)
+                    payload = {'start': chosen[0], 'end': chosen[1], 'midpoints': chosen[2:], 'mode': 'walk'}
+                    app_module.route_cache.clear()
+                    started = time.perf_counter()
+                    response = client.post('/optimal_path', json=payload)
+                    times.append(time.perf_counter() - started)
+                    if response.status_code != 200:
+                        raise RuntimeError(f"{name}: HTTP {response.status_code} {response.get_data(as_text=True)}")
+                stats = summarize(times)
+                stats['requests_per_s'] = len(times) / sum(times)
+                suite.record(name, stats, attractions=count, stops=stop_count, requests=requests_per_case)
+    finally:
+        os.chdir(cwd)
+
+
+def compare(results, baseline, threshold):
+    """按中位数与基线比较，打印对比表并返回回归项名称列表"""
+    regressions = []
+    print(f"\n{'基准':<48} {'基线 ms':>12} {'本次 ms':>12} {'比值':>8}")
+    for name, stats in results.items():
+        old = baseline.get(name)
+        if old is None:
+            print(f"{name:<48} {'-':>12} {stats['median_ms']:12.3f} {'新增':>8}")
+            continue
+        ratio = stats['median_ms'] / old['median_ms'] if old['median_ms'] else float('inf')
+        flag = ''
+        if ratio > threshold:
+            flag = '  回归'
+            regressions.append(name)
+        elif ratio < 1 / threshold:
+            flag = '  提升'
+        print(f"{name:<48} {old['median_ms']:12.3f} {stats['median_ms']:12.3f} {ratio:8.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help='只运行较小的规模')
+    parser.add_argument('--filter', help='只运行名称包含该字符串的基准')
+    parser.add_argument('--repeat', type=int, help='微基准重复轮数（默认 5，--quick 时为 3）')
+    parser.add_argument('--requests', type=int, help='端到端每种规模的请求数（默认 50，--quick 时为 10）')
+    parser.add_argument('--output', default=OUTPUT_PATH, help='结果 JSON 文件')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='基线 JSON 文件')
+    parser.add_argument('--save-baseline', action='store_true', help='把本次结果写入基线文件')
+    parser.add_argument('--threshold', type=float, default=1.25, help='中位数超过基线多少倍视为回归')
+    args = parser.parse_args(argv)
+
+    sizes, stops = (QUICK_SIZES, QUICK_STOPS) if args.quick else (SIZES, STOPS)
+    repeat = args.repeat or (3 if args.quick else 5)
+    requests_per_case = args.requests or (10 if args.quick else 50)
+
+    suite = Suite(args.filter)
+    with tempfile.TemporaryDirectory(prefix='nav-bench-') as workdir:
+        directories = micro_benchmarks(suite, workdir, sizes, stops, repeat)
+        endpoint_benchmarks(suite, directories, stops, requests_per_case)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'quick': args.quick,
+        },
+        'results': suite.results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as out:
+        json.dump(report, out, ensure_ascii=False, indent=2)
+    print(f"\n结果已写入 {args.output}")
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            regressions = compare(suite.results, json.load(file)['results'], args.threshold)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as out:
+            json.dump(report, out, ensure_ascii=False, indent=2)
+        print(f"基线已保存到 {args.baseline}")
+    if regressions:
+        print(f"\n{len(regressions)} 项基准比基线慢 {args.threshold} 倍以上")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
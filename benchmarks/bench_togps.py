@@ -0,0 +1,54 @@
+"""
+GCJ-02 -> WGS-84 坐标转换基准：对比逐点标量实现与向量化实现，并校验两者结果一致。
+
+用法（在仓库根目录执行）：python benchmarks/bench_togps.py [点数]
+"""
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ToGPS import gcj02_to_wgs84, gcj02_to_wgs84_array  # noqa: E402
+
+
+def make_points(count, seed=0):
+    # 以西安为中心生成随机点，并混入少量境外点以覆盖 out_of_china 分支
+    rng = np.random.default_rng(seed)
+    points = np.column_stack([
+        rng.uniform(108.5, 109.5, count),
+        rng.uniform(33.8, 34.6, count),
+    ])
+    points[::50] = rng.uniform([-10.0, -60.0], [60.0, 0.0], (len(points[::50]), 2))
+    return points
+
+
+def scalar_convert(points):
+    return [gcj02_to_wgs84(lon, lat) for lon, lat in points.tolist()]
+
+
+def check_equivalence(points):
+    expected = np.array(scalar_convert(points))
+    lon_lat = gcj02_to_wgs84_array(points, "lon_lat")
+    lat_lon = gcj02_to_wgs84_array(points[:, ::-1], "lat_lon")[:, ::-1]
+    for actual in (lon_lat, lat_lon):
+        error = np.abs(actual - expected).max()
+        if error > 1e-9:
+            raise AssertionError(f"向量化结果与标量结果不一致，最大误差 {error}")
+    return float(np.abs(lon_lat - expected).max())
+
+
+def main(count=100000, repeat=5):
+    points = make_points(count)
+    error = check_equivalence(points)
+    scalar = min(timeit.repeat(lambda: scalar_convert(points), number=1, repeat=repeat))
+    vector = min(timeit.repeat(lambda: gcj02_to_wgs84_array(points), number=1, repeat=repeat))
+    print(f"点数: {count}，最大误差: {error:.3e}")
+    print(f"标量实现:   {scalar * 1000:.2f} ms")
+    print(f"向量化实现: {vector * 1000:.2f} ms  (加速 {scalar / vector:.1f}x)")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
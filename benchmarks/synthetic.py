@@ -0,0 +1,123 @@
+"""
+基准测试用的合成数据：按与 data/ 目录相同的文本格式生成任意规模的景点、路线和折线文件。
+
+前 STOP_POOL 个景点之间两两有路线，端到端测试的起终点和中间点都从中选取；
+其余景点各与后面 degree 个景点相连，路线文件的行数随景点数线性增长。
+"""
+import math
+import os
+import random
+
+import numpy as np
+
+# 两两相连、可作为行程站点的景点数（起点 + 终点 + 最多 20 个中间点）
+STOP_POOL = 22
+# 每个景点额外连接的景点数
+DEFAULT_DEGREE = 20
+# 各交通方式的平均速度（米/秒）和绕行系数
+_SPEED = {'walk': 1.3, 'drive': 8.0, 'bus': 4.5}
+_DETOUR = {'walk': 1.25, 'drive': 1.4, 'bus': 1.35}
+# 与 dataset.PATH_FILES、polyline_store.ROAD_FILES 中的文件名一一对应
+PATH_FILES = {
+    'walk': 'walk.txt',
+    'drive': 'drive.txt',
+    'bus_eco': 'bus_eco.txt',
+    'bus_hc': 'bus_hc.txt',
+    'bus_fw': 'bus_fw.txt',
+    'bus_quick': 'bus_quick.txt',
+}
+ROAD_FILES = {
+    'walk': 'walk_2.0.txt',
+    'drive': 'drive_road.txt',
+    'bus_eco': 'bus_road_eco.txt',
+    'bus_hc': 'bus_road_hc.txt',
+    'bus_fw': 'bus_road_fw.txt',
+    'bus_quick': 'bus_road_quick.txt',
+}
+
+
+def make_attractions(count, seed=0):
+    """生成 count 个西安范围内的景点：[(名称, 编码, 纬度, 经度), ...]"""
+    rng = random.Random(seed)
+    return [
+        (f"景点{i}", f"JD{i + 1:04d}", rng.uniform(34.10, 34.40), rng.uniform(108.75, 109.15))
+        for i in range(count)
+    ]
+
+
+def make_edges(count, degree=DEFAULT_DEGREE):
+    """返回有向路线 [(起点下标, 终点下标), ...]：站点池内两两相连，其余景点各连接后面 degree 个景点"""
+    pool = min(count, STOP_POOL)
+    edges = {(i, j) for i in range(pool) for j in range(pool) if i != j}
+    for i in range(count):
+        for step in range(1, min(degree, count - 1) + 1):
+            edges.add((i, (i + step) % count))
+    return sorted(edges)
+
+
+def _meters(a, b):
+    lat = math.radians((a[2] + b[2]) / 2)
+    return math.hypot((a[2] - b[2]) * 111195, (a[3] - b[3]) * 111195 * math.cos(lat))
+
+
+def _lon_lat(attraction):
+    return f"{attraction[3]:.6f},{attraction[2]:.6f}"
+
+
+def attraction_line(attraction):
+    name, code, lat, lon = attraction
+    return f"{name}, {code}, ({lat}, {lon}),'{name}的简介','门票{len(name) * 10}元','https://example.com/{code}'\n"
+
+
+def path_line(a, b, mode):
+    distance = _meters(a, b) * _DETOUR[mode] + 50
+    prefix = f"{a[0]}( {a[1]}) to {b[0]}( {b[1]}), "
+    fields = f"'origin': '{_lon_lat(a)}', 'destination': '{_lon_lat(b)}', " \
+             f"'distance': '{int(distance)}', 'duration': '{int(distance / _SPEED[mode])}'"
+    if mode != 'bus':
+        return prefix + "{" + fields + ", 'strategy': '速度最快'}\n"
+    return prefix + "{" + fields + f", 'taxi_cost': '{int(8 + distance / 1000 * 2)}', 'bus_cost': '2.0', " \
+        f"'walking_distance': '{int(distance * 0.2)}', 'bus_name': '{len(a[0]) + len(b[0])}路(甲--乙)', " \
+        f"'huanchen': {int(distance) % 3}}}\n"
+
+
+def road_line(a, b, points, rng):
+    """路线折线：起终点之间带随机抖动的 points 个点，分成两段"""
+    t = np.linspace(0.0, 1.0, points)
+    lon = a[3] + (b[3] - a[3]) * t + rng.uniform(-1e-4, 1e-4, points)
+    lat = a[2] + (b[2] - a[2]) * t + rng.uniform(-1e-4, 1e-4, points)
+    coordinates = [f"{x:.6f},{y:.6f}" for x, y in zip(lon, lat)]
+    half = points // 2
+    polylines = [';'.join(coordinates[:half]), ';'.join(coordinates[half:])]
+    return repr({'origin': f' {a[1]}', 'destination': f' {b[1]}', 'polylines': polylines}) + '\n'
+
+
+def write_dataset(directory, count, degree=DEFAULT_DEGREE, road_points=16, seed=0):
+    """
+    在 directory/data 下生成完整的一套数据文件，可以直接在 directory 中启动 app.py。
+
+    :param count: 景点数
+    :param degree: 站点池以外每个景点连接的景点数
+    :param road_points: 每条路线折线的点数
+    :return: 生成的景点列表，见 make_attractions
+    """
+    data_dir = os.path.join(directory, 'data')
+    os.makedirs(data_dir, exist_ok=True)
+    attractions = make_attractions(count, seed)
+    edges = make_edges(count, degree)
+    with open(os.path.join(data_dir, 'attractions_summary.txt'), 'w', encoding='utf-8') as out:
+        out.writelines(attraction_line(attraction) for attraction in attractions)
+    rng = np.random.default_rng(seed)
+    for key, file_name in PATH_FILES.items():
+        mode = key.split('_')[0]
+        with open(os.path.join(data_dir, file_name), 'w', encoding='utf-8') as out:
+            out.writelines(path_line(attractions[i], attractions[j], mode) for i, j in edges)
+        with open(os.path.join(data_dir, ROAD_FILES[key]), 'w', encoding='utf-8') as out:
+            out.writelines(road_line(attractions[i], attractions[j], road_points, rng) for i, j in edges)
+    return attractions
+
+
+def make_gcj02_points(count, seed=0):
+    """西安附近的 count 个随机 GCJ-02 (经度, 纬度) 坐标"""
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.uniform(108.5, 109.5, count), rng.uniform(33.8, 34.6, count)])
@@ -0,0 +1,176 @@
+import os
+import threading
+
+from functions import load_attractions, load_paths, load_paths_v2
+from graph import FrozenGraph, RouteGraph, freeze_graph
+from polyline_store import ROAD_FILES, open_polyline_store
+from snapshot import load_cached, load_frozen, source_key
+
+ATTRACTIONS_FILE = 'data/attractions_summary.txt'
+
+# (交通方式, 公交方案) -> (路线文件, 加载函数)
+PATH_FILES = {
+    ('walk', None): ('data/walk.txt', load_paths),
+    ('drive', None): ('data/drive.txt', load_paths),
+    ('bus', 'economic'): ('data/bus_eco.txt', load_paths_v2),
+    ('bus', 'fewestTransfers'): ('data/bus_hc.txt', load_paths_v2),
+    ('bus', 'fewestWalks'): ('data/bus_fw.txt', load_paths_v2),
+    ('bus', 'quick'): ('data/bus_quick.txt', load_paths_v2),
+}
+
+
+def _source_files(path_files):
+    return [ATTRACTIONS_FILE] + [file_path for file_path, _ in path_files.values()]
+
+
+def _watched_files(path_files):
+    # 重新加载时需要检查的全部文件，包括折线文件
+    return _source_files(path_files) + list(ROAD_FILES.values())
+
+
+def build_graph(key, path_files=PATH_FILES, attractions=None):
+    """解析一个交通方式（公交为一个方案）的路线文件并构建路线图"""
+    file_path, loader = path_files[key]
+    if attractions is None:
+        attractions = load_attractions(ATTRACTIONS_FILE)
+    return RouteGraph(loader(file_path, attractions), key[0])
+
+
+def build_graphs(path_files=PATH_FILES):
+    """解析全部文本数据并构建各交通方式、各公交方案的路线图"""
+    attractions = load_attractions(ATTRACTIONS_FILE)
+    graphs = {key: build_graph(key, path_files, attractions) for key in path_files}
+    return {'attractions': attractions, 'graphs': graphs}
+
+
+def _snapshot_name(key):
+    mode, strategy = key
+    return f"graph-{mode}-{strategy}" if strategy else f"graph-{mode}"
+
+
+class Dataset:
+    """
+    进程内共享的路线数据注册表：景点、按 (交通方式, 公交方案) 索引的路线图以及折线库。
+    各部分在第一次使用时才加载（优先读取各自的快照），只用到步行的进程不会加载公交数据；
+    可用 start_warm_up() 在后台线程中提前加载。reload() 在数据文件变化后丢弃已加载的数据。
+
+    frozen=True 时路线图和折线索引改为只读的 NumPy 数组（FrozenGraph / FrozenRoutes），路线图以内存映射方式
+    打开快照文件。多进程部署时在主进程中加载后再 fork，各 worker 共享同一份物理内存。
+    """
+
+    def __init__(self, path_files=PATH_FILES, frozen=False):
+        self.path_files = path_files
+        self.frozen = frozen
+        self._lock = threading.Lock()
+        self._key = None
+        self._attractions = None
+        self._graphs = {}
+        self._polylines = None
+        self._warm_up = None  # 后台预热线程
+
+    def _load_attractions(self):
+        if self._attractions is None:
+            with self._lock:
+                if self._attractions is None:
+                    self._key = source_key(_watched_files(self.path_files))
+                    self._attractions = load_cached('attractions', [ATTRACTIONS_FILE],
+                                                    lambda: load_attractions(ATTRACTIONS_FILE))
+        return self._attractions
+
+    @property
+    def attractions(self):
+        return self._load_attractions()
+
+    @property
+    def polylines(self):
+        if self._polylines is None:
+            with self._lock:
+                if self._polylines is None:
+                    self._polylines = open_polyline_store(frozen=self.frozen)
+        return self._polylines
+
+    def graph(self, mode, strategy=None):
+        """
+        返回指定交通方式的路线图；公交需要给出方案（economic / fewestTransfers / fewestWalks / quick）。
+
+        :raises KeyError: 交通方式或公交方案不存在
+        """
+        key = (mode, strategy if mode == 'bus' else None)
+        graph = self._graphs.get(key)
+        if graph is None:
+            file_path, _ = self.path_files[key]
+            attractions = self._load_attractions()
+            with self._lock:
+                graph = self._graphs.get(key)
+                if graph is None:
+                    sources = [ATTRACTIONS_FILE, file_path]
+                    if self.frozen:
+                        arrays = load_frozen(_snapshot_name(key), sources,
+                                             lambda: freeze_graph(build_graph(key, self.path_files)))
+                        graph = FrozenGraph(arrays, attractions, key[0])
+                    else:
+                        graph = load_cached(_snapshot_name(key), sources, lambda: build_graph(key, self.path_files))
+                    self._graphs[key] = graph
+        return graph
+
+    def warm_up(self):
+        """依次加载景点、折线库和全部路线图"""
+        self._load_attractions()
+        self.polylines
+        for mode, strategy in self.path_files:
+            self.graph(mode, strategy)
+
+    def start_warm_up(self):
+        """在后台线程中调用 warm_up()，不阻塞服务启动；已经在预热时直接返回该线程"""
+        with self._lock:
+            if self._warm_up is None or not self._warm_up.is_alive():
+                self._warm_up = threading.Thread(target=self.warm_up, name='nav-warm-up', daemon=True)
+                self._warm_up.start()
+            return self._warm_up
+
+    def status(self):
+        """
+        已加载的部分和预热情况，供就绪检查使用。没有启动预热时按需加载，视为就绪；
+        启动了预热时在全部数据加载完成后才就绪。
+        """
+        warm_up = self._warm_up
+        return {
+            'ready': warm_up is None or not warm_up.is_alive(),
+            'warming_up': warm_up is not None and warm_up.is_alive(),
+            'frozen': self.frozen,
+            'attractions': self._attractions is not None,
+            'polylines': self._polylines is not None,
+            'graphs': sorted(f"{mode}:{strategy}" if strategy else mode for mode, strategy in self._graphs),
+        }
+
+    def reload(self, force=False):
+        """
+        检查数据文件是否有变化，有变化（或 force=True）时丢弃已加载的数据，之后按需重新加载。
+
+        :return: 是否发生了重新加载
+        """
+        with self._lock:
+            if not force and (self._key is None or self._key == source_key(_watched_files(self.path_files))):
+                return False
+            self._key = None
+            self._attractions = None
+            self._graphs = {}
+            self._polylines = None
+            return True
+
+
+def create_dataset(backend=None, frozen=None):
+    """
+    按配置创建数据后端：'files'（默认，解析文本文件）或 'sqlite'（读取 transform.py 生成的数据库）。
+    未指定时读取环境变量 NAV_BACKEND，数据库路径由 NAV_DB_PATH 指定。
+    frozen 未指定时读取 NAV_FROZEN，只对 'files' 后端有效。
+    """
+    backend = backend or os.environ.get('NAV_BACKEND', 'files')
+    if backend == 'sqlite':
+        from db_backend import DB_PATH, SQLiteDataset
+        return SQLiteDataset(os.environ.get('NAV_DB_PATH', DB_PATH))
+    if backend == 'files':
+        if frozen is None:
+            frozen = os.environ.get('NAV_FROZEN', '').lower() in ('1', 'true', 'yes')
+        return Dataset(frozen=frozen)
+    raise ValueError(f"未知的数据后端: {backend}")
@@ -0,0 +1,211 @@
+import sqlite3
+import threading
+
+import numpy as np
+
+from models import Attraction, BusPath, Path
+from simplify import simplify
+
+DB_PATH = 'attractions.db'
+
+# 接口中的公交方案 -> 数据库 routes.strategy 取值
+STRATEGY_CODES = {
+    'economic': 'eco',
+    'fewestTransfers': 'hc',
+    'fewestWalks': 'fw',
+    'quick': 'quick',
+}
+
+# 允许生成代价矩阵的字段（用于拼接 SQL，必须是白名单）
+MATRIX_FIELDS = {
+    'distance': 'distance',
+    'duration': 'duration',
+    'bus_cost': 'cost',
+    'taxi_cost': 'taxi_cost',
+    'walking_distance': 'walking_distance',
+    'huanchen': 'transfers',
+}
+
+# 仅公交路线才有的字段
+BUS_ONLY_FIELDS = {'bus_cost', 'taxi_cost', 'walking_distance', 'huanchen'}
+
+# 固定的 SQL 文本，sqlite3 会按文本缓存预编译语句
+_ROUTE_COLUMNS = '''origin_id, dest_id, distance, duration, cost, taxi_cost, walking_distance, bus_name, transfers,
+                    origin_lng, origin_lat, dest_lng, dest_lat'''
+_ROUTE_SQL = f'''
+    SELECT {_ROUTE_COLUMNS} FROM routes
+    WHERE mode = ? AND strategy IS ? AND origin_id = ? AND dest_id = ?
+    ORDER BY id LIMIT 1
+'''
+_POLYLINE_SQL = '''
+    SELECT lng, lat FROM path_points
+    WHERE route_id = (
+        SELECT id FROM routes
+        WHERE mode = ? AND strategy IS ? AND origin_id = ? AND dest_id = ?
+        ORDER BY id LIMIT 1
+    )
+    ORDER BY seq
+'''
+_ATTRACTIONS_SQL = 'SELECT id, name, lat, lng, description, ticket_info, url FROM attractions ORDER BY id'
+
+_EMPTY = np.empty((0, 2), dtype='<f8')
+
+
+class SQLiteGraph:
+    """与 RouteGraph 接口一致的路线图，每次查找走 (mode, strategy, origin_id, dest_id) 索引"""
+
+    def __init__(self, dataset, mode, strategy=None):
+        self.dataset = dataset
+        self.mode = mode
+        self.strategy = strategy
+
+    def _make_path(self, row):
+        (origin_id, dest_id, distance, duration, cost, taxi_cost, walking_distance, bus_name, transfers,
+         origin_lng, origin_lat, dest_lng, dest_lat) = row
+        attractions = self.dataset.attractions
+        from_attraction = attractions.get(origin_id)
+        to_attraction = attractions.get(dest_id)
+        if from_attraction is None or to_attraction is None:
+            return None
+        origin = (origin_lng, origin_lat)
+        destination = (dest_lng, dest_lat)
+        if self.mode == 'bus':
+            return BusPath(from_attraction, to_attraction, origin, destination, distance, duration, taxi_cost, cost,
+                           walking_distance or 0, bus_name, transfers or 0)
+        return Path(from_attraction, to_attraction, origin, destination, distance, duration, None)
+
+    def get(self, start, end):
+        """返回 start -> end 的路线对象，不存在时返回 None"""
+        row = self.dataset.connection().execute(_ROUTE_SQL, (self.mode, self.strategy, start, end)).fetchone()
+        return self._make_path(row) if row else None
+
+    def __contains__(self, pair):
+        return self.get(*pair) is not None
+
+    def codes(self):
+        """返回所有景点编码"""
+        return set(self.dataset.attractions)
+
+    def matrix(self, codes, field='distance', default=None):
+        """与 RouteGraph.matrix 相同，但只用一条查询取出所有相关路线"""
+        column = MATRIX_FIELDS.get(field)
+        if column is None:
+            # 该交通方式没有这个字段，所有存在的路线都取 default
+            column = 'NULL'
+        elif self.mode != 'bus' and field in BUS_ONLY_FIELDS:
+            column = 'NULL'  # 非公交路线的费用、换乘等列没有意义
+        size = len(codes)
+        result = np.full((size, size), np.inf)
+        np.fill_diagonal(result, 0.0)
+        positions = {}
+        for index, code in enumerate(codes):
+            positions.setdefault(code, []).append(index)
+        placeholders = ','.join('?' * len(positions))
+        sql = f'''
+            SELECT origin_id, dest_id, {column} FROM routes
+            WHERE mode = ? AND strategy IS ? AND origin_id IN ({placeholders}) AND dest_id IN ({placeholders})
+            ORDER BY id DESC
+        '''
+        params = [self.mode, self.strategy, *positions, *positions]
+        # 按 id 倒序写入，同一对景点最终保留 id 最小的路线，与 get() 一致
+        for origin_id, dest_id, value in self.dataset.connection().execute(sql, params):
+            if value is None:
+                value = default
+            if value is None:
+                continue
+            for i in positions[origin_id]:
+                for j in positions[dest_id]:
+                    if i != j:
+                        result[i, j] = float(value)
+        return result
+
+
+class SQLitePolylines:
+    """与 PolylineStore 接口一致，从 path_points 表按路线读取 WGS-84 折线；简化阈值在查询时计算"""
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    def get(self, mode, strategy, start_code, end_code, tolerance=None):
+        rows = self.dataset.connection().execute(
+            _POLYLINE_SQL, (mode, STRATEGY_CODES.get(strategy), start_code, end_code)).fetchall()
+        if not rows:
+            return _EMPTY
+        return simplify(np.array(rows, dtype='<f8').reshape(-1, 2), tolerance)
+
+
+class SQLiteDataset:
+    """
+    基于 transform.py 生成的 SQLite 数据库的数据后端，接口与 dataset.Dataset 一致。
+    每个线程持有自己的只读连接；多个 worker 进程共享同一份磁盘数据，不在内存中各自保存路线。
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._attractions = None
+        self._graphs = {}
+        self._warm_up = None
+        self.polylines = SQLitePolylines(self)
+
+    def connection(self):
+        """返回当前线程的数据库连接，首次调用时创建"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA query_only=1')
+            self._local.conn = conn
+        return conn
+
+    @property
+    def attractions(self):
+        if self._attractions is None:
+            self._attractions = {
+                code: Attraction(name, code, (lat, lng), description, price, link)
+                for code, name, lat, lng, description, price, link in self.connection().execute(_ATTRACTIONS_SQL)
+            }
+        return self._attractions
+
+    def graph(self, mode, strategy=None):
+        """
+        返回指定交通方式的路线图。
+
+        :raises KeyError: 交通方式或公交方案不存在
+        """
+        if mode == 'bus':
+            key = (mode, STRATEGY_CODES[strategy])
+        elif mode in ('walk', 'drive'):
+            key = (mode, None)
+        else:
+            raise KeyError(mode)
+        if key not in self._graphs:
+            self._graphs[key] = SQLiteGraph(self, *key)
+        return self._graphs[key]
+
+    def warm_up(self):
+        # 路线数据都在数据库中按需查询，只需预先读取景点
+        self.attractions
+
+    def start_warm_up(self):
+        """在后台线程中调用 warm_up()，接口与 dataset.Dataset 一致"""
+        if self._warm_up is None or not self._warm_up.is_alive():
+            self._warm_up = threading.Thread(target=self.warm_up, name='nav-warm-up', daemon=True)
+            self._warm_up.start()
+        return self._warm_up
+
+    def status(self):
+        warm_up = self._warm_up
+        return {
+            'ready': warm_up is None or not warm_up.is_alive(),
+            'warming_up': warm_up is not None and warm_up.is_alive(),
+            'frozen': False,
+            'attractions': self._attractions is not None,
+            'polylines': True,
+            'graphs': sorted(f"{mode}:{strategy}" if strategy else mode for mode, strategy in self._graphs),
+        }
+
+    def reload(self, force=False):
+        # 路线数据都在数据库中按需查询，只需丢弃缓存的景点信息
+        self._attractions = None
+        return True
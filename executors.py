@@ -0,0 +1,286 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+# Python 3.11 之前与内置的 TimeoutError 不是同一个类
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from multiprocessing import shared_memory
+from typing import NamedTuple
+
+import numpy as np
+
+from tsp import SolveCancelled, set_cancel_check
+
+# 处理请求（含文件、数据库读取）的线程数
+IO_THREADS = int(os.environ.get('NAV_IO_THREADS', 16))
+# 批量规划时并行处理行程的线程数，与请求线程池分开，大批量请求不会占满后者
+BATCH_THREADS = int(os.environ.get('NAV_BATCH_THREADS', 8))
+# 不超过该中间点数的求解直接在当前线程完成，进程间调度的开销比求解本身还大
+INLINE_MAX_STOPS = 8
+# 同时排队或运行的求解任务上限，每个任务在共享内存中占一个取消标志
+MAX_JOBS = 4096
+# 等待求解结果时检查请求是否已取消的间隔（秒）
+_POLL_SECONDS = 0.05
+
+io_pool = ThreadPoolExecutor(max_workers=IO_THREADS, thread_name_prefix='nav-io')
+batch_pool = ThreadPoolExecutor(max_workers=BATCH_THREADS, thread_name_prefix='nav-batch')
+
+_solver_pool = None
+_flags = None  # 共享内存中的取消标志
+_free_slots = []
+_shared = {}  # 路线图 -> SharedMatrices
+_lock = threading.Lock()
+_local = threading.local()
+_attached = {}  # 当前进程已映射的共享内存：名称 -> (SharedMemory, 数组)
+_generation = 0  # 已发布矩阵的代数，clear_shared_matrices 后加 1；求解进程中为最近一次任务所属的代数
+
+
+class MatrixRef(NamedTuple):
+    """共享内存中目标矩阵的一部分：块名称、整块形状和所取景点的下标，可以 pickle 传给求解进程"""
+    name: str
+    shape: tuple
+    indices: tuple
+
+
+class SharedMatrices:
+    """
+    一个路线图全部景点之间的目标矩阵 (目标数, N, N)，构建一次后放进共享内存。
+    求解进程按名称映射同一块内存，任务中只需传递景点下标，不必各自复制路线图。
+    """
+
+    def __init__(self, stacked, codes):
+        stacked = np.ascontiguousarray(stacked, dtype=float)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(stacked.nbytes, 1))
+        self.array = np.ndarray(stacked.shape, dtype=float, buffer=self.shm.buf)
+        self.array[:] = stacked
+        self.index = {code: i for i, code in enumerate(codes)}
+        _attached[self.shm.name] = (self.shm, self.array)
+
+    def ref(self, codes):
+        """返回 codes 对应的 MatrixRef；有景点不在矩阵中时返回 None"""
+        try:
+            indices = tuple(self.index[code] for code in codes)
+        except KeyError:
+            return None
+        return MatrixRef(self.shm.name, self.array.shape, indices)
+
+    def close(self):
+        _attached.pop(self.shm.name, None)
+        self.array = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _attach(name, shape=None, dtype=float):
+    entry = _attached.get(name)
+    if entry is None:
+        # 求解进程与主进程共用同一个资源跟踪器，共享内存仍由主进程负责释放
+        shm = shared_memory.SharedMemory(name=name)
+        array = np.ndarray(shape if shape is not None else (shm.size,), dtype=dtype, buffer=shm.buf)
+        entry = _attached[name] = (shm, array)
+    return entry[1]
+
+
+def _drop_stale(generation, keep):
+    # 求解进程中执行：主进程重新发布矩阵后，释放对上一代共享内存的映射（keep 为取消标志，始终保留）
+    global _generation
+    if generation == _generation:
+        return
+    _generation = generation
+    for name in [name for name in _attached if name != keep]:
+        shm = _attached.pop(name)[0]
+        try:
+            shm.close()
+        except BufferError:
+            pass  # 仍有数组引用这块内存，随这些数组一起释放
+
+
+def resolve_matrices(matrices):
+    """
+    把 MatrixRef 还原为 (目标数, n, n) 数组，MatrixRef 列表还原为 (M, 目标数, n, n)，普通数组原样返回。
+    与 RouteGraph.matrix 一致，同一景点出现两次时两者之间视为没有路线。
+    """
+    if isinstance(matrices, MatrixRef):
+        indices = np.array(matrices.indices)
+        block = _attach(matrices.name, matrices.shape)[:, indices][:, :, indices]
+        repeated = (indices[:, None] == indices[None, :]) & ~np.eye(len(indices), dtype=bool)
+        block[:, repeated] = np.inf
+        return block
+    if isinstance(matrices, list):
+        return np.stack([resolve_matrices(item) for item in matrices])
+    return matrices
+
+
+def enable_solver_pool(processes=None):
+    """
+    启用求解进程池。processes 缺省时读取 NAV_SOLVER_PROCESSES，仍未设置则取 CPU 核数；为 0 时不启用。
+    子进程用 spawn 方式启动，只导入求解相关的模块，不复制主进程的数据和线程。
+    """
+    global _solver_pool, _flags
+    if processes is None:
+        processes = int(os.environ.get('NAV_SOLVER_PROCESSES', os.cpu_count() or 1))
+    with _lock:
+        if _solver_pool is None and processes > 0:
+            _flags = shared_memory.SharedMemory(create=True, size=MAX_JOBS)
+            _free_slots[:] = range(MAX_JOBS)
+            _solver_pool = ProcessPoolExecutor(max_workers=processes,
+                                               mp_context=multiprocessing.get_context('spawn'))
+    return _solver_pool
+
+
+def solver_pool_enabled():
+    return _solver_pool is not None
+
+
+def shared_matrices(graph, build):
+    """
+    返回路线图在共享内存中的目标矩阵，第一次使用时调用 build() 得到 (矩阵, 景点编码列表) 并发布。
+    """
+    with _lock:
+        shared = _shared.get(graph)
+        if shared is None:
+            shared = _shared[graph] = SharedMatrices(*build())
+        return shared
+
+
+def clear_shared_matrices():
+    """数据重新加载后丢弃已发布的矩阵；求解进程在收到下一代的第一个任务时释放对旧矩阵的映射"""
+    global _generation
+    with _lock:
+        for shared in _shared.values():
+            shared.close()
+        _shared.clear()
+        _generation += 1
+
+
+def set_request_cancel(event):
+    """把当前线程正在处理的请求与取消事件关联，事件被设置后该请求的求解任务会被取消"""
+    _local.cancel = event
+
+
+def call_with_cancel(event, fn, *args):
+    """在关联了取消事件的上下文中调用 fn，供线程池中执行的请求使用"""
+    set_request_cancel(event)
+    try:
+        return fn(*args)
+    finally:
+        set_request_cancel(None)
+
+
+def current_cancel():
+    # 当前线程正在处理的请求的取消事件，没有时返回 None
+    return getattr(_local, 'cancel', None)
+
+
+def _run_job(fn, matrices, args, flags_name, slot, generation):
+    # 在求解进程中执行：通过共享内存中的标志响应取消
+    _drop_stale(generation, flags_name)
+    flags = _attach(flags_name, dtype=np.uint8)
+    set_cancel_check(lambda: flags[slot] != 0)
+    try:
+        return fn(resolve_matrices(matrices), *args)
+    finally:
+        set_cancel_check(None)
+
+
+def _release_slot(slot):
+    with _lock:
+        _free_slots.append(slot)
+
+
+def submit_solver(fn, matrices, *args):
+    """
+    把求解任务 fn(矩阵, *args) 提交到进程池，返回 Future。未启用进程池时返回 None。
+    fn 必须是模块级函数；matrices 可以是数组、MatrixRef 或 MatrixRef 列表。
+    """
+    pool = _solver_pool
+    if pool is None:
+        return None
+    with _lock:
+        slot = _free_slots.pop()
+        generation = _generation
+    _flags.buf[slot] = 0
+    future = pool.submit(_run_job, fn, matrices, args, _flags.name, slot, generation)
+    future.slot = slot
+    future.add_done_callback(lambda done: _release_slot(done.slot))
+    return future
+
+
+def cancel_solver(future):
+    """取消求解任务：未开始的直接撤销，正在运行的由子进程在下一次检查时中止"""
+    if not future.cancel() and not future.done() and hasattr(future, 'slot'):
+        _flags.buf[future.slot] = 1
+
+
+def wait_solver(future, cancel=None):
+    """等待求解结果；cancel 事件被设置时取消任务并抛出 SolveCancelled"""
+    if cancel is None:
+        return future.result()
+    while True:
+        try:
+            return future.result(timeout=_POLL_SECONDS)
+        except FutureTimeoutError:
+            if cancel.is_set():
+                cancel_solver(future)
+                raise SolveCancelled()
+
+
+def iter_solver_results(futures, cancel=None):
+    """
+    按完成顺序依次产出 (下标, 结果)，也可用于 batch_pool 的任务。
+    cancel 事件被设置时取消其余任务并抛出 SolveCancelled。
+    """
+    cancel = cancel if cancel is not None else current_cancel()
+    positions = {future: index for index, future in enumerate(futures)}
+    pending = set(futures)
+    try:
+        while pending:
+            if cancel is not None and cancel.is_set():
+                raise SolveCancelled()
+            try:
+                for future in as_completed(pending, timeout=_POLL_SECONDS if cancel is not None else None):
+                    pending.discard(future)
+                    yield positions[future], future.result()
+            except FutureTimeoutError:
+                continue
+    finally:
+        for future in pending:
+            cancel_solver(future)
+
+
+def _matrix_stops(matrices):
+    if isinstance(matrices, MatrixRef):
+        return len(matrices.indices) - 2
+    if isinstance(matrices, list):
+        return _matrix_stops(matrices[0])
+    return matrices.shape[-1] - 2
+
+
+def run_solver(fn, matrices, *args):
+    """
+    调用求解函数 fn(矩阵, *args)：启用了进程池且规模较大时交给子进程，否则直接在当前线程计算。
+    当前请求被取消时（见 set_request_cancel）中止求解并抛出 SolveCancelled。
+    """
+    cancel = current_cancel()
+    if _solver_pool is None or _matrix_stops(matrices) <= INLINE_MAX_STOPS:
+        set_cancel_check(cancel.is_set if cancel is not None else None)
+        try:
+            return fn(resolve_matrices(matrices), *args)
+        finally:
+            set_cancel_check(None)
+    return wait_solver(submit_solver(fn, matrices, *args), cancel)
+
+
+def shutdown():
+    """关闭线程池和进程池并释放共享内存，服务退出时调用"""
+    global _solver_pool, _flags
+    clear_shared_matrices()
+    with _lock:
+        if _solver_pool is not None:
+            _solver_pool.shutdown(cancel_futures=True)
+            _solver_pool = None
+            _flags.close()
+            _flags.unlink()
+            _flags = None
+    io_pool.shutdown(wait=False, cancel_futures=True)
+    batch_pool.shutdown(wait=False, cancel_futures=True)
@@ -1,7 +1,15 @@
-import re
+import logging
+import math
+
+import numpy as np
+
+import executors
 from models import Attraction, Path,BusPath
-from ToGPS import gcj02_to_wgs84
-import itertools
+from route_parser import iter_route_records
+from ToGPS import gcj02_to_wgs84_array
+from tsp import solve_path, solve_path_multi, solve_path_modes
+
+logger = logging.getLogger(__name__)
 
 def load_attractions(file_path):
     attractions = {}
@@ -23,142 +31,91 @@ def load_attractions(file_path):
                 price = parts[5].strip().strip("'")  # 去掉单引号
                 link = parts[6].strip().strip("'")  # 去掉单引号
 
-                attractions[code] = Attraction(name, code, f"{lat}, {lon}", description,price,link)
+                attractions[code] = Attraction(name, code, (lat, lon), description,price,link)
             else:
-                print(f"Error parsing line: {line.strip()}")
+                logger.warning("Error parsing line: %s", line.strip())
     
     return attractions
 
 
 
-def load_paths(file_path, attractions):
-    paths = []
-    path_pattern = re.compile(
-        r"(.+)\((.+)\) to (.+)\((.+)\), \{'origin': '(.+)', 'destination': '(.+)', 'distance': '(\d+)', 'duration': '(\d+)', 'strategy': (.+)\}")
+def _convert_endpoints(raw_points):
+    """
+    将 [起点, 终点, 起点, 终点, ...] 形式的 GCJ-02 (经度, 纬度) 列表一次性转换为 WGS-84，
+    保留 6 位小数，返回 [(起点, 终点), ...]，每个坐标为浮点数元组 (经度, 纬度)。
+    """
+    converted = np.round(gcj02_to_wgs84_array(raw_points, coord_format="lon_lat"), 6).tolist()
+    return [(tuple(converted[i]), tuple(converted[i + 1])) for i in range(0, len(converted), 2)]
 
-    with open(file_path, 'r', encoding='utf-8') as file:
-        for line in file:
-            match = path_pattern.match(line.strip())
-            if match:
-                from_name, from_code, to_name, to_code, origin1, destination1, distance, duration, strategy = match.groups()
-                strategy = strategy if strategy != 'None' else None
-                from_attraction = attractions.get(from_code.strip())
-                to_attraction = attractions.get(to_code.strip())
-                if from_attraction and to_attraction:
-                    origin_lon, origin_lat=map(float, origin1.split(','))
-                    destination_lon, destination_lat = map(float, destination1.split(','))
-                    converted_origin_lon, converted_origin_lat = gcj02_to_wgs84(origin_lon, origin_lat)
-                    converted_destination_lon, converted_destination_lat = gcj02_to_wgs84(destination_lon,destination_lat)
 
-                    # 保证转换后的经纬度格式与原始数据相同，保留6位小数
-                    origin = f"{converted_origin_lon:.6f},{converted_origin_lat:.6f}"
-                    destination = f"{converted_destination_lon:.6f},{converted_destination_lat:.6f}"
-                    paths.append(
-                        Path(from_attraction, to_attraction, origin, destination, distance, duration, strategy))
-    return paths
+def _load_routes(file_path, attractions, required, build):
+    # 流式解析路线文件，起终点景点都存在的行交给 build(起点, 终点, 起点坐标, 终点坐标, record) 生成路线对象
+    records = []
+    raw_points = []
+    for record in iter_route_records(file_path, required=required):
+        from_attraction = attractions.get(record.from_code)
+        to_attraction = attractions.get(record.to_code)
+        if from_attraction and to_attraction:
+            raw_points.append(record.origin)
+            raw_points.append(record.destination)
+            records.append((from_attraction, to_attraction, record))
 
+    # 所有起终点在加载时统一转换一次，模型中直接保存浮点坐标
+    endpoints = _convert_endpoints(raw_points)
+    return [
+        build(from_attraction, to_attraction, origin, destination, record)
+        for (from_attraction, to_attraction, record), (origin, destination) in zip(records, endpoints)
+    ]
 
 
+def _make_path(from_attraction, to_attraction, origin, destination, record):
+    return Path(from_attraction, to_attraction, origin, destination, record.distance, record.duration,
+                record.props.get('strategy'))
 
-def load_paths_v2(file_path, attractions):
-    paths = []
-    path_pattern = re.compile(
-        r"(.+)\((.+)\) to (.+)\((.+)\), \{'origin': '(.+)', 'destination': '(.+)', 'distance': '(\d+)', 'duration': '(\d+)', 'taxi_cost': '(\d+)', 'bus_cost': '([\d.]+)', 'walking_distance': '(\d+)', 'bus_name': '(.+)', 'huanchen': (\d+)\}")
 
-    with open(file_path, 'r', encoding='utf-8') as file:
-        for line in file:
-            match = path_pattern.match(line.strip())
-            if match:
-                (from_name, from_code, to_name, to_code, origin1, destination1, distance, duration,
-                 taxi_cost, bus_cost, walking_distance, bus_name, huanchen) = match.groups()
-
-                from_attraction = attractions.get(from_code.strip())
-                to_attraction = attractions.get(to_code.strip())
-
-                if from_attraction and to_attraction:
-                    # 将经纬度转换为浮点数并执行坐标转换
-                    origin_lon, origin_lat = map(float, origin1.split(','))
-                    destination_lon, destination_lat = map(float, destination1.split(','))
-
-                    converted_origin_lon, converted_origin_lat = gcj02_to_wgs84(origin_lon, origin_lat)
-                    converted_destination_lon, converted_destination_lat = gcj02_to_wgs84(destination_lon, destination_lat)
-
-                    # 保证转换后的经纬度格式与原始数据相同，保留6位小数
-                    origin = f"{converted_origin_lon:.6f},{converted_origin_lat:.6f}"
-                    destination = f"{converted_destination_lon:.6f},{converted_destination_lat:.6f}"
-
-                    # 创建 BusPath 实例并添加到 paths 列表中
-                    paths.append(
-                        BusPath(from_attraction, to_attraction, origin, destination, distance, duration, taxi_cost, bus_cost,
-                                walking_distance, bus_name, huanchen))  # 传递 huanchen 作为整数
-    return paths
-
-
-
-def find_path(path_list, start, end):
-    # 查找对应的路径
-    for path in path_list:
-        if path.from_attraction.code == start and path.to_attraction.code == end:
-            return {
-                'from': path.from_attraction.name,
-                'to': path.to_attraction.name,
-                'coordinates': [
-                    {'lat': float(path.origin.split(',')[1]), 'lon': float(path.origin.split(',')[0])},
-                    {'lat': float(path.destination.split(',')[1]), 'lon': float(path.destination.split(',')[0])}
-                ],
-                'distance': path.distance,
-                'duration': path.duration,
-                'type': 'walk' if 'walk' in path_list else 'drive'
-            }
-    return None
+def _make_bus_path(from_attraction, to_attraction, origin, destination, record):
+    props = record.props
+    return BusPath(from_attraction, to_attraction, origin, destination, record.distance, record.duration,
+                   props['taxi_cost'], props['bus_cost'], props['walking_distance'], props['bus_name'],
+                   props['huanchen'])
 
 
-def find_polylines_in_file(file_path, start_code, end_code):
-    """
-    逐行读取 road.txt 文件，找到起点和终点匹配的路线并返回其 polylines 坐标列表。
+# 公交路线文件中每行必须有的字段
+BUS_FIELDS = ('taxi_cost', 'bus_cost', 'walking_distance', 'bus_name', 'huanchen')
 
-    :param file_path: road.txt 文件的路径
-    :param start_code: 起点编码
-    :param end_code: 终点编码
-    :return: 匹配路线的 polylines 坐标列表，如果没有找到则返回空列表
-    """
-    try:
-        with open(file_path, 'r') as file:
-            for line in file:
-                # 清除空白字符并跳过空行
-                line = line.strip()
-                if not line:
-                    continue
 
-                try:
-                    # 将行转换为字典
-                    road_data = eval(line)  # 使用 eval 解析为字典
+def load_paths(file_path, attractions):
+    return _load_routes(file_path, attractions, (), _make_path)
 
-                    # 去掉空格后比较起点和终点
-                    origin = road_data.get('origin').strip()
-                    destination = road_data.get('destination').strip()
 
-                    if origin == start_code and destination == end_code:
-                        # 初始化 polylines 列表
-                        polylines = []
+def load_paths_v2(file_path, attractions):
+    return _load_routes(file_path, attractions, BUS_FIELDS, _make_bus_path)
+
 
-                        # 解析多段 polylines 信息并返回
-                        for polyline in road_data.get('polylines', []):
-                            coordinates = [tuple(map(float, point.split(','))) for point in polyline.split(';')]
-                            polylines.extend(coordinates)
 
-                        return polylines
+def find_path(graph, start, end):
+    # 通过路线图直接查找对应的路径
+    path = graph.get(start, end)
+    if path is None:
+        return None
+    return {
+        'from': path.from_attraction.name,
+        'to': path.to_attraction.name,
+        'coordinates': [
+            {'lat': path.origin[1], 'lon': path.origin[0]},
+            {'lat': path.destination[1], 'lon': path.destination[0]}
+        ],
+        'distance': path.distance,
+        'duration': path.duration,
+        'type': graph.mode
+    }
 
-                except Exception as e:
-                    pass  # 解析失败时忽略该行并继续
 
-    except FileNotFoundError:
-        print(f"File {file_path} not found.")
-    except Exception as e:
-        print(f"Error while reading file: {e}")
+def find_fast_path(graph, start, end):
+    # 返回 start -> end 的用时，没有路线时返回 None
+    path = graph.get(start, end)
+    return int(path.duration) if path is not None else None
 
-    # 没有找到匹配的路线，返回空列表
-    return []
 
 def split_midpoints(midpoints_str):
     # 使用分号将字符串分割并去除多余空格
@@ -203,46 +160,277 @@ def split_midpoints(midpoints_str):
 
 
 
-def calculate_distance(path_list, start_code, mid_codes, end_code):
-    mid_codes = mid_codes + [end_code]
-    min_distance = float('inf')
-    best_path = []
+# 优化目标 -> 路线对象上的字段
+OBJECTIVE_FIELDS = {
+    'distance': 'distance',
+    'duration': 'duration',
+    'cost': 'bus_cost',
+    'transfers': 'huanchen',
+}
 
-    # 缓存已计算路径
-    path_cache = {}
+# 常用目标组合；费用和换乘次数经常并列，用很小的用时权重区分
+OBJECTIVE_PRESETS = {
+    'shortest': {'distance': 1.0},
+    'fastest': {'duration': 1.0},
+    'cheapest': {'cost': 1.0, 'duration': 0.01},
+    'fewestTransfers': {'transfers': 1.0, 'duration': 0.01},
+}
 
-    # 计算起点到每个中间点的最短路径
-    def get_path_distance(start, end):
-        if (start, end) in path_cache:
-            return path_cache[(start, end)]
-        path = find_path(path_list, start, end)
-        distance = int(path['distance']) if path else float('inf')
-        path_cache[(start, end)] = distance
-        return distance
 
-    for mid_order in itertools.permutations(mid_codes):
-        current_location = start_code
-        total_distance = 0
-        full_path = [start_code]
+def parse_objective(objective):
+    """
+    将优化目标统一为 {目标: 权重}。支持单个目标名（'duration'）、预设名（'cheapest'）
+    或权重字典（{'duration': 1, 'cost': 0.5}），为空时按距离最短。
 
-        for mid_code in mid_order:
-            distance = get_path_distance(current_location, mid_code)
-            if distance != float('inf'):
-                total_distance += distance
-                full_path.append(mid_code)
-                current_location = mid_code
-                # 提前终止当前路径的计算，如果超出已知最小距离
-                if total_distance >= min_distance:
-                    break
-            else:
-                total_distance = float('inf')
-                break
+    :raises ValueError: 目标名未知或权重不合法
+    """
+    if not objective:
+        return {'distance': 1.0}
+    if isinstance(objective, str):
+        if objective in OBJECTIVE_FIELDS:
+            return {objective: 1.0}
+        if objective in OBJECTIVE_PRESETS:
+            return dict(OBJECTIVE_PRESETS[objective])
+        raise ValueError(f"未知的优化目标: {objective}")
+    if not isinstance(objective, dict):
+        raise ValueError("优化目标必须是目标名或权重字典")
+    weights = {}
+    for name, weight in objective.items():
+        if name not in OBJECTIVE_FIELDS:
+            raise ValueError(f"未知的优化目标: {name}")
+        weight = float(weight)
+        if not math.isfinite(weight) or weight < 0:
+            raise ValueError("优化目标权重必须是非负的有限数字")
+        if weight:
+            weights[name] = weight
+    if not weights:
+        raise ValueError("优化目标权重不能全为 0")
+    return weights
+
+
+def cost_matrix(graph, codes):
+    """
+    费用矩阵。步行和驾车没有票价字段，按 0 计；公交票价未知（原始数据为 '[]'，多为定制、旅游专线）时
+    改用同一路段的出租车费用作为保守估计，两者都没有时按已知的最高票价计，不会被当作免费。
+    """
+    if graph.mode != 'bus':
+        return graph.matrix(codes, 'bus_cost', default=0.0)
+    fares = graph.matrix(codes, 'bus_cost')
+    unknown = np.isfinite(graph.matrix(codes, 'distance')) & ~np.isfinite(fares)
+    fares = np.where(unknown, graph.matrix(codes, 'taxi_cost'), fares)
+    unknown &= ~np.isfinite(fares)
+    if unknown.any():
+        known = fares[np.isfinite(fares)]
+        fares[unknown] = known.max() if known.size else 0.0
+    return fares
+
+
+def objective_matrices(graph, codes):
+    """按 OBJECTIVE_FIELDS 的顺序堆叠各目标的代价矩阵，形状为 (目标数, n, n)；费用见 cost_matrix，换乘缺失时按 0 计"""
+    return np.stack([
+        cost_matrix(graph, codes) if name == 'cost' else
+        graph.matrix(codes, field, default=0.0 if name == 'transfers' else None)
+        for name, field in OBJECTIVE_FIELDS.items()
+    ])
+
+
+def _objective_scales(stacked):
+    # 各目标正值的平均数；stacked 的倒数第三维为目标，多种交通方式一起计算以便互相比较
+    values = np.where(np.isfinite(stacked), stacked, 0.0)
+    scales = []
+    for index in range(len(OBJECTIVE_FIELDS)):
+        matrix = values[..., index, :, :]
+        positive = matrix[matrix > 0]
+        scales.append(positive.mean() if positive.size else 1.0)
+    return np.array(scales)
+
+
+def _weighted_costs(stacked, weights_list, scales=None):
+    """
+    把堆叠的目标矩阵按多组权重合成为 (K, ..., n, n) 的代价矩阵。
+    各目标先除以自身正值的平均数，使不同单位（米、秒、元、次）的权重可以直接比较。
+    """
+    if scales is None:
+        scales = _objective_scales(stacked)
+    reachable = np.isfinite(stacked).all(axis=-3)
+    values = np.where(np.isfinite(stacked), stacked, 0.0)
+    weights = np.array([[w.get(name, 0.0) for name in OBJECTIVE_FIELDS] for w in weights_list])
+    combined = np.einsum('kf,...fij->k...ij', weights / scales, values)
+    combined[:, ~reachable] = np.inf
+    return combined
+
+
+def _solver_matrices(graph, codes):
+    """
+    返回 (目标矩阵, 传给求解函数的矩阵)。启用求解进程池时，路线图全部景点之间的目标矩阵只构建一次并放进
+    共享内存，后者为其中的引用，求解进程直接读取；否则两者是同一个数组。
+    """
+    if not executors.solver_pool_enabled():
+        stacked = objective_matrices(graph, codes)
+        return stacked, stacked
+
+    def build():
+        all_codes = sorted(graph.codes())
+        return objective_matrices(graph, all_codes), all_codes
 
-        if total_distance < min_distance:
-            min_distance = total_distance
-            best_path = full_path
+    ref = executors.shared_matrices(graph, build).ref(codes)
+    if ref is None:
+        stacked = objective_matrices(graph, codes)
+        return stacked, stacked
+    return executors.resolve_matrices(ref), ref
 
-    return best_path[1:]
+
+def _solve_weighted(stacked, weights, solver, budget_ms):
+    # 求解进程中执行：按权重合成代价矩阵后求解
+    return solve_path(_weighted_costs(stacked, [weights])[0], solver, budget_ms)
+
+
+def _solve_presets(stacked, weights_list, solver, budget_ms):
+    return solve_path_multi(_weighted_costs(stacked, weights_list), solver, budget_ms)
+
+
+def _solve_mixed(stacked, weights, switch_penalty, solver, budget_ms):
+    # stacked 为 (M, F, n, n)；换乘惩罚以秒计，按用时目标的尺度换算
+    scales = _objective_scales(stacked)
+    costs = _weighted_costs(stacked, [weights], scales)[0]
+    penalty = switch_penalty / scales[list(OBJECTIVE_FIELDS).index('duration')]
+    return solve_path_modes(costs, penalty, solver, budget_ms)
+
+
+def _route_metrics(stacked, order):
+    # 沿访问顺序累加各目标的原始值
+    sequence = [0] + order
+    totals = stacked[:, sequence[:-1], sequence[1:]].sum(axis=1)
+    return {name: float(total) for name, total in zip(OBJECTIVE_FIELDS, totals)}
+
+
+def plan_itinerary(graph, start_code, mid_codes, end_code, solver='auto', budget_ms=None, objective=None):
+    """
+    固定起点和终点，求访问全部中间点的最优顺序。
+
+    :param solver: 'exact'（Held–Karp 动态规划）、'heuristic'（近邻 + 2-opt/Or-opt，受 budget_ms 限制）或 'auto'
+    :param budget_ms: 启发式求解的时间预算（毫秒）
+    :param objective: 优化目标，见 parse_objective，默认距离最短
+    :return: 字典，order 为按最优顺序排列并以终点结尾的编码列表（没有可行路线时为空列表），
+             另含 total（按目标权重计算的原始值之和）、metrics（各目标合计）、solver 和 gap（最优性差距估计）
+    """
+    weights = parse_objective(objective)
+    codes = [start_code] + mid_codes + [end_code]
+    stacked, matrices = _solver_matrices(graph, codes)
+    order, _, used_solver, gap = executors.run_solver(_solve_weighted, matrices, weights, solver, budget_ms)
+    metrics = _route_metrics(stacked, order) if order else {}
+    return {
+        'order': [codes[index] for index in order],
+        'total': sum(metrics[name] * weight for name, weight in weights.items()) if order else float('inf'),
+        'metrics': metrics,
+        'solver': used_solver,
+        'gap': gap,
+    }
+
+
+def plan_alternatives(graph, start_code, mid_codes, end_code, solver='auto', budget_ms=None,
+                      presets=OBJECTIVE_PRESETS):
+    """
+    一次求出多个目标预设下的最优行程：所有预设的加权代价矩阵在同一遍动态规划中求解，
+    结果相同的合并，被其它方案在所有目标上支配的方案剔除，得到帕累托前沿。
+
+    :return: 列表，每项包含 labels（对应的预设名）、order 和 metrics
+    """
+    codes = [start_code] + mid_codes + [end_code]
+    stacked, matrices = _solver_matrices(graph, codes)
+    results = executors.run_solver(_solve_presets, matrices, list(presets.values()), solver, budget_ms)
+
+    alternatives = {}
+    for label, (order, _, _, _) in zip(presets, results):
+        if not order:
+            continue
+        key = tuple(order)
+        if key not in alternatives:
+            alternatives[key] = {
+                'labels': [],
+                'order': [codes[index] for index in order],
+                'metrics': _route_metrics(stacked, order),
+            }
+        alternatives[key]['labels'].append(label)
+
+    candidates = list(alternatives.values())
+
+    def dominated(a, b):
+        # b 在所有目标上都不差于 a，且至少一个目标更好
+        pairs = [(a['metrics'][name], b['metrics'][name]) for name in OBJECTIVE_FIELDS]
+        return all(y <= x for x, y in pairs) and any(y < x for x, y in pairs)
+
+    return [a for a in candidates if not any(dominated(a, b) for b in candidates if b is not a)]
+
+
+# 混合出行中每次更换交通方式的默认惩罚，折算为秒（按用时目标的尺度换算成代价）
+DEFAULT_SWITCH_PENALTY = 300
+
+
+def _switch_penalty_matrix(modes, switch_penalty):
+    """
+    生成 (M, M) 的换乘惩罚矩阵（单位：秒）。switch_penalty 可以是统一的数值，
+    也可以是 {'walk->bus': 120, ...} 形式的字典，未列出的方式组合按 DEFAULT_SWITCH_PENALTY 计。
+
+    :raises ValueError: 惩罚值不合法或方式名未知
+    """
+    if switch_penalty is None:
+        switch_penalty = DEFAULT_SWITCH_PENALTY
+    if isinstance(switch_penalty, dict):
+        penalty = np.full((len(modes), len(modes)), float(DEFAULT_SWITCH_PENALTY))
+        for key, value in switch_penalty.items():
+            source, _, target = key.partition('->')
+            if source not in modes or target not in modes:
+                raise ValueError(f"未知的换乘组合: {key}")
+            penalty[modes.index(source), modes.index(target)] = float(value)
+    else:
+        penalty = np.full((len(modes), len(modes)), float(switch_penalty))
+    if not np.isfinite(penalty).all() or (penalty < 0).any():
+        raise ValueError("换乘惩罚必须是非负的有限数字")
+    np.fill_diagonal(penalty, 0.0)
+    return penalty
+
+
+def plan_mixed_itinerary(graphs, start_code, mid_codes, end_code, solver='auto', budget_ms=None, objective=None,
+                         switch_penalty=None):
+    """
+    混合出行：在步行、驾车、公交等多层路线图上同时决定访问顺序和每一段的交通方式。
+
+    :param graphs: {交通方式名: 路线图}，如 {'walk': ..., 'drive': ..., 'bus': ...}
+    :param switch_penalty: 更换交通方式的惩罚（秒），数值或字典，见 _switch_penalty_matrix
+    :return: 与 plan_itinerary 相同的字典，另含 modes（每一段使用的交通方式名）
+    """
+    weights = parse_objective(objective)
+    modes = list(graphs)
+    codes = [start_code] + mid_codes + [end_code]
+    # (M, F, n, n)：各交通方式的目标矩阵，统一尺度后才能在方式之间比较
+    pairs = [_solver_matrices(graphs[mode], codes) for mode in modes]
+    stacked = np.stack([local for local, _ in pairs])
+    matrices = [shared for _, shared in pairs]
+    if not all(isinstance(shared, executors.MatrixRef) for shared in matrices):
+        matrices = stacked
+    penalty = _switch_penalty_matrix(modes, switch_penalty)
+    order, leg_modes, _, used_solver, gap = executors.run_solver(_solve_mixed, matrices, weights, penalty, solver,
+                                                                 budget_ms)
+
+    metrics = {}
+    if order:
+        sequence = [0] + order
+        totals = stacked[leg_modes, :, sequence[:-1], sequence[1:]].sum(axis=0)
+        metrics = {name: float(total) for name, total in zip(OBJECTIVE_FIELDS, totals)}
+    return {
+        'order': [codes[index] for index in order],
+        'modes': [modes[index] for index in leg_modes],
+        'total': sum(metrics[name] * weight for name, weight in weights.items()) if order else float('inf'),
+        'metrics': metrics,
+        'solver': used_solver,
+        'gap': gap,
+    }
+
+
+def calculate_distance(graph, start_code, mid_codes, end_code, solver='auto', budget_ms=None):
+    # 只返回访问顺序，供只关心顺序的调用方使用
+    return plan_itinerary(graph, start_code, mid_codes, end_code, solver, budget_ms)['order']
 
 
 
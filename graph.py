@@ -0,0 +1,188 @@
+import numpy as np
+
+from models import BusPath, Path
+
+# 冻结路线图中 values 数组各列对应的路线字段；起终点坐标各占两列，缺失的字段为 NaN
+FROZEN_FIELDS = ('distance', 'duration', 'origin_lon', 'origin_lat', 'destination_lon', 'destination_lat',
+                 'taxi_cost', 'bus_cost', 'walking_distance', 'huanchen')
+_COLUMNS = {field: i for i, field in enumerate(FROZEN_FIELDS)}
+
+
+class RouteGraph:
+    """
+    按景点编码索引的路线图，加载时构建一次：edges[起点编码][终点编码] -> Path/BusPath。
+    所有路线查找都是两次字典访问，与路线总数无关。
+    """
+
+    def __init__(self, paths, mode=None):
+        self.mode = mode
+        self.edges = {}
+        for path in paths:
+            # 与原来的线性查找一致：同一对景点只保留第一条路线
+            self.edges.setdefault(path.from_attraction.code, {}).setdefault(path.to_attraction.code, path)
+
+    def get(self, start, end):
+        """返回 start -> end 的路线对象，不存在时返回 None"""
+        targets = self.edges.get(start)
+        return targets.get(end) if targets else None
+
+    def __contains__(self, pair):
+        return self.get(*pair) is not None
+
+    def __iter__(self):
+        for targets in self.edges.values():
+            yield from targets.values()
+
+    def __len__(self):
+        return sum(len(targets) for targets in self.edges.values())
+
+    def codes(self):
+        """返回路线图中出现过的所有景点编码"""
+        result = set(self.edges)
+        for targets in self.edges.values():
+            result.update(targets)
+        return result
+
+    def matrix(self, codes, field='distance', default=None):
+        """
+        按给定编码顺序生成稠密矩阵，matrix[i][j] 为 codes[i] -> codes[j] 的 field 值，
+        没有路线的位置为 inf，对角线为 0。
+
+        :param default: 路线存在但没有该字段（或值为 None）时使用的值；为 None 时视为不可达
+        """
+        size = len(codes)
+        result = np.full((size, size), np.inf)
+        np.fill_diagonal(result, 0.0)
+        for i, start in enumerate(codes):
+            targets = self.edges.get(start)
+            if not targets:
+                continue
+            for j, end in enumerate(codes):
+                path = targets.get(end)
+                if path is not None and i != j:
+                    value = getattr(path, field, None)
+                    if value is None:
+                        value = default
+                    if value is not None:
+                        result[i, j] = float(value)
+        return result
+
+
+def freeze_graph(graph):
+    """
+    把 RouteGraph 展平成 FrozenGraph 使用的数组：nodes 为排好序的景点编码，
+    每条路线的键 pairs 为 起点下标 * len(nodes) + 终点下标，按键排序；
+    数值字段在 values 中，策略名或公交线路名以 UTF-8 拼接在 text 中，由 text_offsets 切分。
+    """
+    nodes = sorted(graph.codes())
+    position = {code: i for i, code in enumerate(nodes)}
+    rows = sorted((position[start], position[end], path)
+                  for start, targets in graph.edges.items() for end, path in targets.items())
+    values = np.full((len(rows), len(FROZEN_FIELDS)), np.nan)
+    has_text = np.zeros(len(rows), dtype=bool)
+    text_offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    texts = []
+    for row, (_, _, path) in enumerate(rows):
+        values[row, 0:6] = (path.distance, path.duration) + tuple(path.origin) + tuple(path.destination)
+        for field in FROZEN_FIELDS[6:]:
+            value = getattr(path, field, None)
+            if value is not None:
+                values[row, _COLUMNS[field]] = value
+        text = path.bus_name if isinstance(path, BusPath) else path.strategy
+        encoded = b''
+        if text is not None:
+            has_text[row] = True
+            encoded = str(text).encode('utf-8')
+            texts.append(encoded)
+        text_offsets[row + 1] = text_offsets[row] + len(encoded)
+    return {
+        'nodes': np.array(nodes, dtype=str) if nodes else np.empty(0, dtype='<U1'),
+        'pairs': np.array([start * len(nodes) + end for start, end, _ in rows], dtype=np.int64),
+        'values': values,
+        'has_text': has_text,
+        'text_offsets': text_offsets,
+        'text': np.frombuffer(b''.join(texts), dtype=np.uint8),
+    }
+
+
+class FrozenGraph:
+    """
+    与 RouteGraph 接口一致的只读路线图，数据全部在 freeze_graph 生成的 NumPy 数组中（通常是内存映射的文件）。
+    数组里没有 Python 对象，访问时不修改引用计数，fork 出的 worker 进程之间不会因写时复制各自拷贝一份；
+    get() 每次按需构造 Path/BusPath，起终点景点取自 attractions。
+    """
+
+    def __init__(self, arrays, attractions, mode=None):
+        self.mode = mode
+        self.attractions = attractions
+        self.nodes = arrays['nodes']
+        self.pairs = arrays['pairs']
+        self.values = arrays['values']
+        self.has_text = arrays['has_text']
+        self.text_offsets = arrays['text_offsets']
+        self.text = arrays['text']
+
+    def _lookup(self, codes):
+        # codes 两两之间的路线在数组中的行号，形状为 (n, n)，没有路线的位置为 -1
+        n = len(self.nodes)
+        if not len(self.pairs) or not len(codes):  # 节点都来自路线，没有路线时也没有节点
+            return np.full((len(codes), len(codes)), -1, dtype=np.int64)
+        codes = np.asarray(codes, dtype=str)
+        nodes = np.minimum(np.searchsorted(self.nodes, codes), n - 1)
+        known = self.nodes[nodes] == codes
+        keys = nodes[:, None] * n + nodes[None, :]
+        rows = np.minimum(np.searchsorted(self.pairs, keys), len(self.pairs) - 1)
+        found = known[:, None] & known[None, :] & (self.pairs[rows] == keys)
+        return np.where(found, rows, -1)
+
+    def _edge(self, start, end):
+        return int(self._lookup([start, end])[0, 1])
+
+    def _make_path(self, row, start=None, end=None):
+        if start is None:
+            start, end = (str(self.nodes[i]) for i in divmod(int(self.pairs[row]), len(self.nodes)))
+        values = self.values[row].tolist()
+        text = None
+        if self.has_text[row]:
+            text = self.text[self.text_offsets[row]:self.text_offsets[row + 1]].tobytes().decode('utf-8')
+        from_attraction, to_attraction = self.attractions.get(start), self.attractions.get(end)
+        origin, destination = (values[2], values[3]), (values[4], values[5])
+        if self.mode != 'bus':
+            return Path(from_attraction, to_attraction, origin, destination, values[0], values[1], text)
+        taxi_cost, bus_cost = (None if value != value else value for value in values[6:8])
+        return BusPath(from_attraction, to_attraction, origin, destination, values[0], values[1], taxi_cost, bus_cost,
+                       values[8], text, values[9])
+
+    def get(self, start, end):
+        """返回 start -> end 的路线对象，不存在时返回 None"""
+        row = self._edge(start, end)
+        return self._make_path(row, start, end) if row >= 0 else None
+
+    def __contains__(self, pair):
+        return self._edge(*pair) >= 0
+
+    def __iter__(self):
+        for row in range(len(self.pairs)):
+            yield self._make_path(row)
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def codes(self):
+        """返回路线图中出现过的所有景点编码"""
+        return set(self.nodes.tolist())
+
+    def matrix(self, codes, field='distance', default=None):
+        """与 RouteGraph.matrix 相同，全部景点对用一次 searchsorted 查出"""
+        size = len(codes)
+        rows = self._lookup(codes)
+        column = _COLUMNS.get(field)  # 不在数组中的字段视为缺失
+        if column is not None and len(self.values):
+            values = self.values[np.maximum(rows, 0), column]
+        else:
+            values = np.full((size, size), np.nan)
+        if default is not None:
+            values = np.where(np.isnan(values), default, values)
+        result = np.where((rows >= 0) & ~np.isnan(values), values, np.inf)
+        np.fill_diagonal(result, 0.0)
+        return result
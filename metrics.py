@@ -0,0 +1,161 @@
+"""
+请求耗时统计：直方图、计数器和按阶段划分的计时区间，以 Prometheus 文本格式输出（见 app.py 的 /metrics）。
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+# 直方图桶的上界（秒），从 0.1 毫秒到 10 秒
+BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_local = threading.local()
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if value != float('inf') else '+Inf'
+
+
+class Counter:
+    """按标签分组的累加计数器"""
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}')
+        return lines
+
+
+class Histogram:
+    """按标签分组的直方图，桶为累计计数，与 Prometheus 的 histogram 类型一致"""
+
+    def __init__(self, name, help_text, labelnames=(), buckets=BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # 标签 -> [各桶计数..., 总和, 次数]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets + (float('inf'),), series[:len(self.buckets)] + [series[-1]]):
+                    label_text = _labels(self.labelnames, labels, [('le', _number(bound))])
+                    lines.append(f'{self.name}_bucket{label_text} {count}')
+                lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-2])}')
+                lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}')
+        return lines
+
+
+def scalar(name, help_text, value, kind='gauge'):
+    """单个无标签的指标（如由其他模块维护的缓存计数），导出时现算"""
+    return [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', f'{name} {_number(value)}']
+
+
+REQUEST_SECONDS = Histogram('nav_request_duration_seconds', '请求处理耗时（秒）', ('endpoint', 'method'))
+REQUESTS = Counter('nav_requests_total', '已处理的请求数', ('endpoint', 'method', 'status'))
+STAGE_SECONDS = Histogram('nav_stage_duration_seconds', '路线规划各阶段耗时（秒），每次规划每个阶段记录一次', ('stage',))
+
+
+def begin_trace():
+    """开始在当前线程收集各阶段耗时"""
+    _local.spans = {}
+
+
+def end_trace():
+    """
+    结束当前线程的收集，把每个阶段的累计耗时记入 STAGE_SECONDS。
+
+    :return: 阶段名 -> 秒，按阶段首次出现的顺序
+    """
+    spans = _local.__dict__.pop('spans', None) or {}
+    for stage, seconds in spans.items():
+        STAGE_SECONDS.observe(seconds, stage)
+    return spans
+
+
+@contextmanager
+def span(stage):
+    """
+    为一个阶段计时。同一次规划中同名阶段（如逐段读取折线）的耗时累加；
+    当前线程没有调用 begin_trace 时每次单独记录。
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        spans = getattr(_local, 'spans', None)
+        if spans is None:
+            STAGE_SECONDS.observe(elapsed, stage)
+        else:
+            spans[stage] = spans.get(stage, 0.0) + elapsed
+
+
+def process_memory():
+    """
+    当前进程的内存占用（字节），读取 Linux 的 /proc/self/smaps_rollup：
+    rss 为常驻内存，pss 为按共享进程数分摊后的占用，private 为本进程独占（fork 后被写时复制）的部分。
+    其他平台返回空字典。
+    """
+    fields = {'Rss': 'rss', 'Pss': 'pss', 'Private_Clean': 'private', 'Private_Dirty': 'private'}
+    result = {}
+    try:
+        with open('/proc/self/smaps_rollup', 'r') as file:
+            for line in file:
+                name, _, value = line.partition(':')
+                if name in fields:
+                    key = fields[name]
+                    result[key] = result.get(key, 0) + int(value.split()[0]) * 1024
+    except (OSError, ValueError):
+        return {}
+    return result
+
+
+def observe_request(endpoint, method, status, seconds):
+    REQUEST_SECONDS.observe(seconds, endpoint, method)
+    REQUESTS.inc(endpoint, method, str(status))
+
+
+def render(*extra):
+    """
+    以 Prometheus 文本格式导出全部指标。
+
+    :param extra: 额外的若干组指标行，如 scalar() 的结果
+    """
+    lines = REQUEST_SECONDS.render() + REQUESTS.render() + STAGE_SECONDS.render()
+    for group in extra:
+        lines.extend(group)
+    return '\n'.join(lines) + '\n'
@@ -1,22 +1,38 @@
+def _to_float(value):
+    # 公交费用可能为 '[]' 等非数字（无票价信息），统一转换为 None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
 class Attraction:
+    __slots__ = ('name', 'code', 'lat', 'lon', 'description', 'price', 'link')
+
     def __init__(self, name, code, coordinates, description, price=None, link=None):
         self.name = name
         self.code = code
-        self.coordinates = coordinates
+        self.lat, self.lon = (float(value) for value in coordinates)  # WGS-84 (纬度, 经度)
         self.description = description
         self.price = price  # 新增
         self.link = link  # 新增
 
+    @property
+    def coordinates(self):
+        return self.lat, self.lon
+
     def __repr__(self):
-        return f"{self.name} ({self.code}), 坐标: {self.coordinates}, 描述: {self.description}"
+        return f"{self.name} ({self.code}), 坐标: {self.lat}, {self.lon}, 描述: {self.description}"
 
 
 
 class Path:
+    __slots__ = ('from_attraction', 'to_attraction', 'origin', 'destination', 'distance', 'duration', 'strategy')
+
     def __init__(self, from_attraction, to_attraction, origin, destination, distance, duration, strategy):
         self.from_attraction = from_attraction
         self.to_attraction = to_attraction
-        self.origin = origin
+        self.origin = origin  # WGS-84 浮点坐标 (经度, 纬度)
         self.destination = destination
         self.distance = int(distance)
         self.duration = int(duration)
@@ -27,18 +43,21 @@ class Path:
         return f"{self.from_attraction} 到 {self.to_attraction}, 距离: {self.distance}m, 用时: {self.duration}s, 策略: {self.strategy}"
 
 class BusPath:
+    __slots__ = ('from_attraction', 'to_attraction', 'origin', 'destination', 'distance', 'duration',
+                 'taxi_cost', 'bus_cost', 'walking_distance', 'bus_name', 'huanchen')
+
     def __init__(self, from_attraction, to_attraction, origin, destination, distance, duration, taxi_cost, bus_cost, walking_distance, bus_name,huanchen):
         self.from_attraction = from_attraction
         self.to_attraction = to_attraction
-        self.origin = origin
+        self.origin = origin  # WGS-84 浮点坐标 (经度, 纬度)
         self.destination = destination
-        self.distance = distance
-        self.duration = duration
-        self.taxi_cost = taxi_cost
-        self.bus_cost = bus_cost
-        self.walking_distance = walking_distance
+        self.distance = int(distance)
+        self.duration = int(duration)
+        self.taxi_cost = _to_float(taxi_cost)
+        self.bus_cost = _to_float(bus_cost)
+        self.walking_distance = int(walking_distance)
         self.bus_name = bus_name
-        self.huanchen = huanchen
+        self.huanchen = int(huanchen)
 
     def __repr__(self):
-        return f"{self.from_attraction} 到 {self.to_attraction}, 距离: {self.distance}m, 用时: {self.duration}s, 出租车费用: {self.taxi_cost}元, 公交费用: {self.bus_cost}元,步行距离: {self.walking_distance}m, 公交线路: {self.bus_name},换乘次数：{self.huanchen}"
\ No newline at end of file
+        return f"{self.from_attraction} 到 {self.to_attraction}, 距离: {self.distance}m, 用时: {self.duration}s, 出租车费用: {self.taxi_cost}元, 公交费用: {self.bus_cost}元,步行距离: {self.walking_distance}m, 公交线路: {self.bus_name},换乘次数：{self.huanchen}"
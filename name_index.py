@@ -0,0 +1,131 @@
+from bisect import bisect_left
+from collections import defaultdict
+
+_pinyin = None  # (lazy_pinyin, Style)，第一次生成前缀表时导入；未安装 pypinyin 时为 (None, None)
+
+# 搜索结果的排序：完全匹配、名称前缀、名称包含、拼音前缀
+_EXACT, _PREFIX, _SUBSTRING, _PINYIN = range(4)
+
+
+def _bigrams(text):
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def _load_pinyin():
+    # pypinyin 导入时要加载整个词典（约 0.3 秒），推迟到第一次生成前缀表，不拖慢进程启动
+    global _pinyin
+    if _pinyin is None:
+        try:
+            from pypinyin import Style, lazy_pinyin
+            _pinyin = (lazy_pinyin, Style)
+        except ImportError:  # 拼音检索是可选功能，未安装 pypinyin 时只按汉字检索
+            _pinyin = (None, None)
+    return _pinyin
+
+
+def _pinyin_keys(name):
+    # 全拼（dayanta）和首字母（dyt）
+    lazy_pinyin, Style = _load_pinyin()
+    if lazy_pinyin is None:
+        return []
+    full = ''.join(lazy_pinyin(name)).lower()
+    initials = ''.join(lazy_pinyin(name, style=Style.FIRST_LETTER)).lower()
+    return [key for key in {full, initials} if key and key != name.lower()]
+
+
+class AttractionIndex:
+    """
+    景点名称索引：名称 -> 编码的哈希表，名称和拼音的有序前缀表，以及单字、二元组的倒排表。
+    查找和补全只访问与查询相关的条目，开销不随景点总数线性增长。
+    """
+
+    def __init__(self, attractions):
+        self.attractions = attractions
+        self.by_name = {}
+        self.order = {}
+        self.chars = defaultdict(set)
+        self.grams = defaultdict(set)
+        for position, attraction in enumerate(attractions.values()):
+            code, name = attraction.code, attraction.name
+            self.order[code] = position
+            self.by_name.setdefault(name, code)
+            lowered = name.lower()
+            for char in lowered:
+                self.chars[char].add(code)
+            for gram in _bigrams(lowered):
+                self.grams[gram].add(code)
+        self._prefix_keys = None
+
+    @property
+    def prefix_keys(self):
+        """名称和拼音的有序前缀表，第一次补全时才生成，按名称查编码的请求不需要导入 pypinyin"""
+        if self._prefix_keys is None:
+            prefix_keys = []
+            for attraction in self.attractions.values():
+                code, name = attraction.code, attraction.name
+                prefix_keys.append((name.lower(), _PREFIX, code))
+                prefix_keys.extend((key, _PINYIN, code) for key in _pinyin_keys(name))
+            prefix_keys.sort()
+            self._prefix_keys = prefix_keys
+        return self._prefix_keys
+
+    def code(self, name):
+        """按完整名称返回编码，不存在时返回 None"""
+        return self.by_name.get(name)
+
+    def _containing(self, text):
+        # 名称中包含 text 的景点编码：先用倒排表求候选，再逐个确认
+        text = text.lower()
+        if not text:
+            return set()
+        if len(text) == 1:
+            return set(self.chars.get(text, ()))
+        postings = [self.grams.get(gram) for gram in _bigrams(text)]
+        if not all(postings):
+            return set()
+        candidates = set.intersection(*postings)
+        return {code for code in candidates if text in self.attractions[code].name.lower()}
+
+    def _with_prefix(self, text):
+        # (排序类别, 编码)，名称或拼音以 text 开头
+        text = text.lower()
+        position = bisect_left(self.prefix_keys, (text,))
+        while position < len(self.prefix_keys):
+            key, kind, code = self.prefix_keys[position]
+            if not key.startswith(text):
+                break
+            yield kind, code
+            position += 1
+
+    def find(self, text):
+        """
+        返回与 text 完全同名的景点，没有时返回名称包含 text 的第一个景点（按景点原有顺序）。
+        """
+        code = self.by_name.get(text)
+        if code is None:
+            matches = self._containing(text)
+            code = min(matches, key=self.order.get) if matches else None
+        return self.attractions[code] if code is not None else None
+
+    def search(self, query, limit=10):
+        """
+        自动补全：按 完全匹配 > 名称前缀 > 名称包含 > 拼音前缀 的顺序返回最多 limit 个景点，
+        同一类别内保持景点原有顺序。
+        """
+        query = query.strip()
+        if not query:
+            return []
+        ranks = {}
+
+        def add(code, rank):
+            if code not in ranks or rank < ranks[code]:
+                ranks[code] = rank
+
+        if query in self.by_name:
+            add(self.by_name[query], _EXACT)
+        for kind, code in self._with_prefix(query):
+            add(code, kind)
+        for code in self._containing(query):
+            add(code, _SUBSTRING)
+        ranked = sorted(ranks, key=lambda code: (ranks[code], self.order[code]))
+        return [self.attractions[code] for code in ranked[:limit]]
@@ -0,0 +1,215 @@
+import ast
+import json
+import os
+import time
+
+import numpy as np
+
+from simplify import douglas_peucker_weights, simplify
+from snapshot import atomic_write
+from ToGPS import gcj02_to_wgs84_array
+
+# (交通方式, 公交方案) -> 原始路线折线文件
+ROAD_FILES = {
+    ('walk', None): 'data/walk_2.0.txt',
+    ('drive', None): 'data/drive_road.txt',
+    ('bus', 'economic'): 'data/bus_road_eco.txt',
+    ('bus', 'fewestTransfers'): 'data/bus_road_hc.txt',
+    ('bus', 'fewestWalks'): 'data/bus_road_fw.txt',
+    ('bus', 'quick'): 'data/bus_road_quick.txt',
+}
+
+# 预编译后的坐标文件（小端 float64，每个点为已转换为 WGS-84 的 经度,纬度）与索引文件
+BIN_PATH = 'data/polylines.bin'
+INDEX_PATH = 'data/polylines.idx.json'
+# 与坐标一一对应的 Douglas–Peucker 保留阈值（小端 float32，米），用于按缩放级别简化
+LOD_PATH = 'data/polylines.lod.bin'
+# 二进制格式版本，变化后旧索引会被自动重建
+FORMAT_VERSION = 4
+# 打开时遇到其他进程正在重建（坐标文件与索引不匹配）的重试次数
+OPEN_ATTEMPTS = 5
+
+_EMPTY = np.empty((0, 2), dtype='<f8')
+
+
+def _route_key(mode, strategy, start_code, end_code):
+    return f"{mode}|{strategy or ''}|{start_code}|{end_code}"
+
+
+def _source_stamp(file_path):
+    # 用修改时间和文件大小判断原始文件是否变化
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def iter_road_file(file_path):
+    """
+    逐行解析 road.txt 文件，依次产出 (起点编码, 终点编码, polylines 坐标数组)。
+    使用 ast.literal_eval 代替 eval，解析失败的行直接跳过。
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                road_data = ast.literal_eval(line)
+                origin = road_data['origin'].strip()
+                destination = road_data['destination'].strip()
+                points = [
+                    point.split(',')
+                    for polyline in road_data.get('polylines', [])
+                    for point in polyline.split(';')
+                ]
+                coordinates = np.array(points, dtype='<f8').reshape(-1, 2)
+            except Exception:
+                continue
+            yield origin, destination, coordinates
+
+
+def build_polyline_index(road_files=ROAD_FILES, bin_path=BIN_PATH, index_path=INDEX_PATH, lod_path=LOD_PATH):
+    """
+    将所有 road 文件一次性解析、转换为 WGS-84 并写入二进制坐标文件，同时生成
+    (mode, strategy, 起点, 终点) -> (偏移, 点数) 的索引，并预先计算每个点的简化阈值。
+    """
+    routes = {}
+    sources = {}
+    offset = 0
+    # 坐标和阈值文件先于索引替换；索引中记下这两个文件的 inode，读取方据此确认三者属于同一次构建
+    with atomic_write(bin_path) as out, atomic_write(lod_path) as lod_out:
+        inodes = [os.fstat(out.fileno()).st_ino, os.fstat(lod_out.fileno()).st_ino]
+        for (mode, strategy), file_path in road_files.items():
+            stamp = _source_stamp(file_path)
+            sources[file_path] = stamp
+            if stamp is None:
+                continue
+            chunks = []
+            for origin, destination, coordinates in iter_road_file(file_path):
+                key = _route_key(mode, strategy, origin, destination)
+                if key in routes:
+                    continue  # 与原逐行查找一致，保留第一条匹配记录
+                chunks.append(coordinates)
+                routes[key] = [offset, len(coordinates)]
+                offset += len(coordinates)
+            if not chunks:
+                continue
+            # 整个文件的坐标一起转换、一起计算简化阈值
+            converted = gcj02_to_wgs84_array(np.concatenate(chunks))
+            out.write(converted.astype('<f8').tobytes())
+            weights = douglas_peucker_weights(converted, [len(chunk) for chunk in chunks])
+            lod_out.write(weights.astype('<f4').tobytes())
+
+    with atomic_write(index_path) as out:
+        out.write(json.dumps({'version': FORMAT_VERSION, 'sources': sources, 'inodes': inodes,
+                              'routes': routes}).encode('utf-8'))
+
+
+def _index_is_fresh(road_files, bin_path, index_path, lod_path):
+    if not (os.path.exists(bin_path) and os.path.exists(index_path) and os.path.exists(lod_path)):
+        return False
+    try:
+        with open(index_path, 'r', encoding='utf-8') as file:
+            index = json.load(file)
+    except ValueError:
+        return False
+    return index.get('version') == FORMAT_VERSION and \
+        index.get('sources') == {path: _source_stamp(path) for path in road_files.values()}
+
+
+class FrozenRoutes:
+    """
+    只读的路线索引：排好序的路线键数组和对应的 (偏移, 点数) 数组，用二分查找代替字典。
+    不含 Python 对象，fork 出的 worker 进程之间共享同一份内存。
+    """
+
+    def __init__(self, routes):
+        keys = sorted(routes)
+        self.keys = np.array(keys, dtype=str) if keys else np.empty(0, dtype='<U1')
+        self.entries = np.array([routes[key] for key in keys], dtype=np.int64).reshape(-1, 2)
+
+    def get(self, key, default=None):
+        i = int(np.searchsorted(self.keys, key))
+        if i < len(self.keys) and self.keys[i] == key:
+            return self.entries[i].tolist()
+        return default
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __iter__(self):
+        return iter(self.keys.tolist())
+
+
+class PolylineStore:
+    """
+    内存映射的折线坐标库，一次查询只需字典查找 + 切片，开销与点数成正比。
+    frozen=True 时路线索引改用 FrozenRoutes，供多进程部署在主进程中预先加载。
+    """
+
+    def __init__(self, bin_path=BIN_PATH, index_path=INDEX_PATH, lod_path=LOD_PATH, frozen=False):
+        """
+        :raises ValueError: 坐标文件与索引不是同一次构建的结果（其他进程正在重建）
+        """
+        with open(index_path, 'r', encoding='utf-8') as file:
+            index = json.load(file)
+        # 映射已打开的文件，确认映射到的正是索引所描述的那一份
+        with open(bin_path, 'rb') as bin_file, open(lod_path, 'rb') as lod_file:
+            if [os.fstat(bin_file.fileno()).st_ino, os.fstat(lod_file.fileno()).st_ino] != index.get('inodes'):
+                raise ValueError("折线坐标文件与索引不匹配")
+            if os.fstat(bin_file.fileno()).st_size > 0:
+                self.points = np.memmap(bin_file, dtype='<f8', mode='r').reshape(-1, 2)
+                self.weights = np.memmap(lod_file, dtype='<f4', mode='r')
+            else:
+                self.points = _EMPTY
+                self.weights = np.empty(0, dtype='<f4')
+        self.routes = index['routes']
+        if frozen:
+            self.routes = FrozenRoutes(self.routes)
+
+    def get(self, mode, strategy, start_code, end_code, tolerance=None):
+        """
+        返回指定路线的 polylines 坐标数组，形状为 (N, 2)，每行为 WGS-84 (经度, 纬度)。
+
+        :param tolerance: 简化容差（米），为空时返回全部坐标点
+        :return: 只读的坐标视图，如果没有找到则返回空数组
+        """
+        entry = self.routes.get(_route_key(mode, strategy, start_code, end_code))
+        if entry is None:
+            return _EMPTY
+        offset, count = entry
+        points = self.points[offset:offset + count]
+        if tolerance:
+            return simplify(points, tolerance, self.weights[offset:offset + count])
+        return points
+
+    def __contains__(self, key):
+        return _route_key(*key) in self.routes
+
+    def __len__(self):
+        return len(self.routes)
+
+
+def open_polyline_store(road_files=ROAD_FILES, bin_path=BIN_PATH, index_path=INDEX_PATH, lod_path=LOD_PATH,
+                        frozen=False):
+    """打开折线库；索引不存在或原始文件有变化时先重新构建，读到其他进程重建到一半的文件时重新打开。"""
+    for attempt in range(OPEN_ATTEMPTS):
+        if not _index_is_fresh(road_files, bin_path, index_path, lod_path):
+            build_polyline_index(road_files, bin_path, index_path, lod_path)
+        try:
+            return PolylineStore(bin_path, index_path, lod_path, frozen)
+        except (OSError, ValueError):
+            if attempt == OPEN_ATTEMPTS - 1:
+                raise
+            time.sleep(0.05 * (attempt + 1))
+
+
+if __name__ == '__main__':
+    build_polyline_index()
+    store = PolylineStore()
+    print(f"已索引 {len(store)} 条路线，共 {len(store.points)} 个坐标点")
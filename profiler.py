@@ -0,0 +1,96 @@
+"""
+慢请求采样分析：请求处理期间由后台线程定时记录处理线程的调用栈，
+请求耗时超过阈值时把采样结果以折叠栈格式（flamegraph.pl / speedscope 可直接读取）写入文件，否则丢弃。
+
+通过环境变量启用：NAV_PROFILE_SLOW_MS（阈值，毫秒；未设置或为 0 时不采样）、
+NAV_PROFILE_INTERVAL_MS（采样间隔，默认 5 毫秒）、NAV_PROFILE_DIR（输出目录，默认 profiles）。
+求解进程池中的计算不在请求线程内，只会表现为等待结果的栈。
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+SLOW_MS = float(os.environ.get('NAV_PROFILE_SLOW_MS', 0))
+INTERVAL_MS = float(os.environ.get('NAV_PROFILE_INTERVAL_MS', 5))
+PROFILE_DIR = os.environ.get('NAV_PROFILE_DIR', 'profiles')
+
+
+def _collapse(frame):
+    # 由外到内的 "函数 (文件:行)" 序列，用分号连接
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class SamplingProfiler:
+    """
+    按固定间隔采样已登记线程的调用栈。采样线程在第一次 start() 时启动，没有登记的线程时处于等待状态。
+    """
+
+    def __init__(self, slow_ms=SLOW_MS, interval_ms=INTERVAL_MS, output_dir=PROFILE_DIR):
+        self.slow_ms = slow_ms
+        self.interval = interval_ms / 1000
+        self.output_dir = output_dir
+        self._samples = {}  # 线程编号 -> Counter(折叠栈 -> 次数)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return self.slow_ms > 0
+
+    def start(self):
+        """开始采样当前线程"""
+        with self._lock:
+            self._samples[threading.get_ident()] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='nav-profiler', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def stop(self):
+        """停止采样当前线程，返回采到的 Counter(折叠栈 -> 次数)"""
+        with self._lock:
+            return self._samples.pop(threading.get_ident(), Counter())
+
+    def _run(self):
+        own = threading.get_ident()
+        while True:
+            self._wakeup.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                if not self._samples:
+                    self._wakeup.clear()
+                    continue
+                for ident, samples in self._samples.items():
+                    frame = frames.get(ident)
+                    if frame is not None and ident != own:
+                        samples[_collapse(frame)] += 1
+            del frames
+
+    def finish(self, label, elapsed_ms):
+        """
+        停止采样当前线程；耗时达到阈值时写出采样结果。
+
+        :param label: 写入文件名的请求标识，如路由
+        :return: 写出的文件路径，未达到阈值或没有采样时返回 None
+        """
+        samples = self.stop()
+        if elapsed_ms < self.slow_ms or not samples:
+            return None
+        os.makedirs(self.output_dir, exist_ok=True)
+        safe_label = re.sub(r'[^\w.-]+', '_', label).strip('_') or 'request'
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        file_path = os.path.join(self.output_dir, f"{stamp}-{safe_label}-{elapsed_ms:.0f}ms-{threading.get_ident()}.folded")
+        with open(file_path, 'w', encoding='utf-8') as out:
+            for stack, count in samples.most_common():
+                out.write(f"{stack} {count}\n")
+        return file_path
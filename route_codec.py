@@ -0,0 +1,79 @@
+import json
+import struct
+
+import numpy as np
+
+# Google encoded polyline 使用 5 位小数精度
+POLYLINE_PRECISION = 5
+
+# 可选的路线响应格式 -> MIME 类型
+FORMAT_MIMETYPES = {
+    'json': 'application/json',
+    'polyline': 'application/vnd.nav.polyline+json',
+    'binary': 'application/octet-stream',
+}
+
+
+def encode_polyline(points, precision=POLYLINE_PRECISION):
+    """
+    按 Google encoded polyline 算法编码坐标（向量化实现）。
+
+    :param points: (N, 2) 的 (纬度, 经度) 数组
+    :return: 编码后的 ASCII 字符串
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(points) == 0:
+        return ''
+    scaled = np.round(points * 10 ** precision).astype(np.int64)
+    deltas = np.diff(scaled, axis=0, prepend=0).ravel()
+    values = deltas << 1
+    values = np.where(deltas < 0, ~values, values)
+    # 每个值按 5 位一组从低位到高位输出，后面还有分组时加 0x20，最后统一加 63
+    shifts = 5 * np.arange(7)
+    groups = values[:, None] >> shifts
+    chunks = (groups & 0x1f) | np.where(groups >= 0x20, 0x20, 0)
+    needed = (groups > 0)
+    needed[:, 0] = True
+    return (chunks[needed] + 63).astype(np.uint8).tobytes().decode('ascii')
+
+
+def decode_polyline(text, precision=POLYLINE_PRECISION):
+    """encode_polyline 的逆运算，返回 (N, 2) 的 (纬度, 经度) 数组"""
+    values = []
+    current = shift = 0
+    for char in text.encode('ascii'):
+        chunk = char - 63
+        current |= (chunk & 0x1f) << shift
+        if chunk & 0x20:
+            shift += 5
+            continue
+        values.append(~(current >> 1) if current & 1 else current >> 1)
+        current = shift = 0
+    deltas = np.array(values, dtype=np.int64).reshape(-1, 2)
+    return np.cumsum(deltas, axis=0) / 10 ** precision
+
+
+def pack_route(meta, segments):
+    """
+    打包二进制路线响应：
+    4 字节小端 uint32 元数据长度 + UTF-8 JSON 元数据（用空格补齐到 4 字节对齐）+
+    所有分段依次拼接的小端 float32 (纬度, 经度) 坐标。元数据中 segments 为各分段的点数。
+
+    :param meta: 除坐标外的响应字段
+    :param segments: 各分段的 (N, 2) 的 (纬度, 经度) 数组
+    :return: bytes
+    """
+    meta = dict(meta, segments=[len(segment) for segment in segments])
+    header = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+    header += b' ' * (-len(header) % 4)
+    points = np.concatenate(segments) if segments else np.empty((0, 2))
+    return struct.pack('<I', len(header)) + header + points.astype('<f4').tobytes()
+
+
+def unpack_route(body):
+    """pack_route 的逆运算，返回 (元数据, 各分段坐标数组列表)"""
+    (length,) = struct.unpack_from('<I', body)
+    meta = json.loads(body[4:4 + length].decode('utf-8'))
+    points = np.frombuffer(body, dtype='<f4', offset=4 + length).reshape(-1, 2)
+    bounds = np.cumsum([0] + meta['segments'])
+    return meta, [points[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
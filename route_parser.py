@@ -0,0 +1,193 @@
+"""
+路线文本格式的流式解析器，每行形如：
+
+    大雁塔( JD001) to 大唐芙蓉园( JD002), {'origin': '108.964162,34.21828', 'destination': '...', 'distance': '3687', ...}
+
+一次扫描完成：先按固定分隔符切出起终点名称和编码，再从左到右逐个匹配属性字典中的 "键: 值"，
+每个匹配都不含贪婪的 (.+)，不会像整行正则那样反复回溯；属性字典只接受字符串、数字和 None/True/False 字面量，不执行任何代码。
+多出的键原样保留，格式不对的行按行号报告而不是静默丢弃。
+"""
+import ast
+import logging
+import re
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# 属性字典中的一个 "键: 值" 加上其后的 ',' 或 '}'。值依次为：不含转义的单引号/双引号字符串、数字、
+# None/True/False、含转义的字符串
+_PAIR = re.compile(r"""\s*(?:'([^'\\]*)'|"([^"\\]*)")\s*:\s*"""
+                   r"""(?:'([^'\\]*)'|"([^"\\]*)"|(-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)(?![\w.])|(None|True|False)\b"""
+                   r"""|('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"))\s*([,}])""")
+_NUMBER = re.compile(r'-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?')
+_CONSTANTS = {'None': None, 'True': True, 'False': False}
+
+
+class RouteRecord(NamedTuple):
+    """一行路线数据。origin / destination 为 GCJ-02 (经度, 纬度)，props 为其余属性（值为原样的字面量）"""
+    line_no: int
+    from_name: str
+    from_code: str
+    to_name: str
+    to_code: str
+    origin: tuple
+    destination: tuple
+    distance: int
+    duration: int
+    props: dict
+
+
+class RouteParseError(ValueError):
+    def __init__(self, line_no, reason):
+        super().__init__(f"第 {line_no} 行: {reason}")
+        self.line_no = line_no
+        self.reason = reason
+
+
+def _number(text):
+    return float(text) if any(char in text for char in '.eE') else int(text)
+
+
+def parse_props(line, pos=0):
+    """
+    从 line[pos] 处的 '{' 开始解析属性字典，字典之后只允许空白。
+
+    :return: 属性字典
+    :raises ValueError: 不是合法的字面量字典
+    """
+    if line[pos:pos + 1] != '{':
+        raise ValueError(f"第 {pos + 1} 列应为 '{{'")
+    props = {}
+    pos += 1
+    for pair in _PAIR.finditer(line, pos):
+        if pair.start() != pos:
+            break
+        key, double_key, single, double, number, constant, escaped, separator = pair.groups()
+        if single is not None:
+            value = single
+        elif double is not None:
+            value = double
+        elif number is not None:
+            value = _number(number)
+        elif constant is not None:
+            value = _CONSTANTS[constant]
+        else:
+            value = ast.literal_eval(escaped)  # 只对带转义的单个字符串字面量求值
+        props[key if key is not None else double_key] = value
+        pos = pair.end()
+        if separator == '}':
+            if pos < len(line) and not line[pos:].isspace():
+                raise ValueError("属性字典之后有多余内容")
+            return props
+    if line[pos:].strip() == '}':
+        return props  # 空字典
+    raise ValueError(f"第 {pos + 1} 列起不是 '字段名': 字符串、数字或 None 的形式")
+
+
+def _simple_props(body):
+    """
+    快速路径：body 为花括号之间的内容，且不含双引号和反斜杠。此时所有字符串都是不含引号的单引号字符串，
+    ", '" 只会出现在两个字段之间，直接按它切分即可；遇到不符合预期的内容返回 None，交给 parse_props。
+    """
+    props = {}
+    if not body:
+        return props
+    if body[0] != "'":
+        return None
+    for item in body[1:].split(", '"):
+        key, colon, value = item.partition("': ")
+        if not colon or "'" in key:
+            return None
+        if value[:1] == "'":
+            if len(value) < 2 or value.find("'", 1) != len(value) - 1:
+                return None
+            props[key] = value[1:-1]
+        elif value in _CONSTANTS:
+            props[key] = _CONSTANTS[value]
+        elif _NUMBER.fullmatch(value):
+            props[key] = _number(value)
+        else:
+            return None
+    return props
+
+
+def _split_endpoint(text):
+    # "名称( 编码" -> (名称, 编码)，名称中可以有括号，编码取最后一个括号内的内容
+    name, bracket, code = text.rpartition('(')
+    code = code.strip()
+    if not bracket or not code:
+        raise ValueError(f"无法识别景点及编码: {text.strip()!r}")
+    return name.strip(), code
+
+
+def _lon_lat(value, field):
+    try:
+        lon, lat = value.split(',')
+        return float(lon), float(lat)
+    except (AttributeError, ValueError):
+        raise ValueError(f"{field} 不是 '经度,纬度' 格式: {value!r}") from None
+
+
+def _integer(value, field):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} 不是整数: {value!r}") from None
+
+
+def parse_route_line(line, line_no=0):
+    """
+    解析一行路线数据。
+
+    :return: RouteRecord
+    :raises RouteParseError: 格式不对，带行号和原因
+    """
+    try:
+        line = line.rstrip()
+        split = line.find('), {')
+        if split < 0:
+            raise ValueError("缺少 '), {' 分隔的属性字典")
+        middle = line.find(') to ', 0, split)
+        if middle < 0:
+            raise ValueError("缺少 ') to ' 分隔的起点和终点")
+        from_name, from_code = _split_endpoint(line[:middle])
+        to_name, to_code = _split_endpoint(line[middle + 5:split])
+        props = None
+        if line[-1] == '}' and line.find('"', split) < 0 and line.find('\\', split) < 0:
+            props = _simple_props(line[split + 4:-1])
+        if props is None:
+            props = parse_props(line, split + 3)
+        return RouteRecord(
+            line_no, from_name, from_code, to_name, to_code,
+            _lon_lat(props.pop('origin', None), 'origin'),
+            _lon_lat(props.pop('destination', None), 'destination'),
+            _integer(props.pop('distance', None), 'distance'),
+            _integer(props.pop('duration', None), 'duration'),
+            props,
+        )
+    except ValueError as e:
+        raise RouteParseError(line_no, str(e)) from None
+
+
+def iter_route_records(file_path, errors=None, required=()):
+    """
+    逐行读取路线文件，依次产出 RouteRecord；空行跳过，格式不对的行记录警告后跳过。
+
+    :param errors: 可选的列表，格式不对的行以 RouteParseError 追加到其中
+    :param required: props 中必须存在的字段，缺少时该行视为格式不对
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        for line_no, line in enumerate(file, 1):
+            if line.isspace():
+                continue
+            try:
+                record = parse_route_line(line, line_no)
+                if required and not all(field in record.props for field in required):
+                    missing = [field for field in required if field not in record.props]
+                    raise RouteParseError(line_no, f"缺少字段 {', '.join(missing)}")
+            except RouteParseError as e:
+                logger.warning("%s:%d: %s", file_path, e.line_no, e.reason)
+                if errors is not None:
+                    errors.append(e)
+                continue
+            yield record
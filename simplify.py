@@ -0,0 +1,107 @@
+import math
+
+import numpy as np
+
+# 小于该距离（米）的偏差不再细分，对应的点在任何缩放级别下都会被省略
+MIN_TOLERANCE = 0.5
+# Web 墨卡托投影下 0 级缩放每像素对应的米数（赤道处）
+METERS_PER_PIXEL_Z0 = 156543.03392
+MAX_ZOOM = 18
+
+_METERS_PER_DEGREE = 111320.0
+
+
+def _project(points, counts):
+    # 经纬度 -> 以各条折线中心纬度为基准的平面米制坐标（等距圆柱投影，城市范围内误差可忽略）
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    mean_lat = np.add.reduceat(points[:, 1], starts) / counts
+    scale = np.repeat(np.cos(np.radians(mean_lat)), counts)
+    return np.column_stack((points[:, 0] * _METERS_PER_DEGREE * scale, points[:, 1] * _METERS_PER_DEGREE))
+
+
+def douglas_peucker_weights(points, counts=None):
+    """
+    计算 Douglas–Peucker 简化中每个点的保留阈值（米）：容差小于该值时点会被保留。
+    子区间的阈值不超过父区间，因此按任意容差筛选都与该容差下的 Douglas–Peucker 结果一致，
+    同一份阈值即可得到所有缩放级别的简化折线。
+    所有待细分的区间按层同时处理，每一层只需几次数组运算。
+
+    :param points: (N, 2) 的 (经度, 纬度) 数组，可以是多条折线首尾相接
+    :param counts: 各条折线的点数，缺省时视为一条折线
+    :return: (N,) 的 float32 数组，每条折线的首尾两点为 inf
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    counts = np.asarray([len(points)] if counts is None else counts, dtype=np.int64)
+    weights = np.zeros(len(points), dtype=np.float32)
+    counts = counts[counts > 0]
+    if len(counts) == 0:
+        return weights
+    ends = np.cumsum(counts) - 1
+    starts = ends - counts + 1
+    weights[starts] = weights[ends] = np.inf
+
+    xy = _project(points, counts)
+    long_enough = counts >= 3
+    first, last = starts[long_enough], ends[long_enough]
+    limit = np.full(len(first), np.inf)
+    while len(first):
+        # 展开所有区间的内部点：ids 为所属区间，index 为点下标
+        lengths = last - first - 1
+        offsets = np.cumsum(lengths) - lengths
+        ids = np.repeat(np.arange(len(first)), lengths)
+        index = np.arange(lengths.sum()) - offsets[ids] + first[ids] + 1
+
+        origin = xy[first]
+        segment = xy[last] - origin
+        length2 = (segment * segment).sum(axis=1)
+        inner = xy[index] - origin[ids]
+        projection = (inner * segment[ids]).sum(axis=1)
+        t = np.clip(np.divide(projection, length2[ids], out=np.zeros_like(projection), where=length2[ids] > 0),
+                    0.0, 1.0)
+        offsets_xy = inner - t[:, None] * segment[ids]
+        distances = np.hypot(offsets_xy[:, 0], offsets_xy[:, 1])
+
+        # 每个区间距离最大的点（并列时取第一个）
+        maximum = np.maximum.reduceat(distances, offsets)
+        hits = np.flatnonzero(distances == maximum[ids])
+        _, first_hit = np.unique(ids[hits], return_index=True)
+        middle = index[hits[first_hit]]
+        distance = np.minimum(maximum, limit)
+
+        # 偏差小于 MIN_TOLERANCE 的区间内的点都近似在线段上，阈值保持为 0
+        split = distance >= MIN_TOLERANCE
+        first, middle, last, distance = first[split], middle[split], last[split], distance[split]
+        weights[middle] = distance
+        first = np.concatenate((first, middle))
+        last = np.concatenate((middle, last))
+        limit = np.concatenate((distance, distance))
+        open_ = last - first >= 2
+        first, last, limit = first[open_], last[open_], limit[open_]
+    return weights
+
+
+def zoom_tolerance(zoom, latitude=34.26):
+    """
+    返回地图缩放级别下一个像素对应的米数，作为该级别的简化容差。
+    默认纬度取西安，超过 MAX_ZOOM 时按 MAX_ZOOM 计算。
+
+    :raises ValueError: zoom 不是有限的数字
+    """
+    if not math.isfinite(float(zoom)):
+        raise ValueError(f"缩放级别必须是有限的数字: {zoom}")
+    zoom = min(max(int(zoom), 0), MAX_ZOOM)
+    return METERS_PER_PIXEL_Z0 * math.cos(math.radians(latitude)) / (1 << zoom)
+
+
+def simplify(points, tolerance, weights=None):
+    """
+    按容差（米）简化折线；weights 为预先计算好的 douglas_peucker_weights，缺省时现场计算。
+
+    :return: 简化后的 (M, 2) 坐标数组，tolerance 为空或不大于 0 时原样返回；容差最小按 MIN_TOLERANCE 计
+    """
+    if not tolerance or tolerance <= 0 or len(points) < 3:
+        return points
+    tolerance = max(tolerance, MIN_TOLERANCE)
+    if weights is None:
+        weights = douglas_peucker_weights(points)
+    return points[weights > tolerance]
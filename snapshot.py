@@ -0,0 +1,148 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+from contextlib import contextmanager
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 快照目录；快照格式变化时修改 SNAPSHOT_VERSION 使旧快照失效
+SNAPSHOT_DIR = 'data/.cache'
+SNAPSHOT_VERSION = 3
+# 冻结数组文件中各数组起始位置的对齐字节数
+_ALIGN = 64
+
+
+def source_key(sources):
+    """根据源文件路径、修改时间和大小计算快照键，任一文件变化都会得到新的键"""
+    digest = hashlib.sha1(str(SNAPSHOT_VERSION).encode())
+    for file_path in sources:
+        try:
+            stat = os.stat(file_path)
+            stamp = f"{file_path}|{stat.st_mtime_ns}|{stat.st_size}"
+        except FileNotFoundError:
+            stamp = f"{file_path}|missing"
+        digest.update(stamp.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def load_cached(name, sources, build, snapshot_dir=SNAPSHOT_DIR):
+    """
+    读取名为 name 的二进制快照；快照不存在或源文件有变化时调用 build() 重新生成并保存。
+
+    :param name: 快照名称，对应 snapshot_dir 下的 <name>.pkl
+    :param sources: 构建数据所依赖的源文件路径列表
+    :param build: 无参数的构建函数，返回需要缓存的数据
+    :return: build() 的结果（可能来自快照）
+    """
+    key = source_key(sources)
+    snapshot_path = os.path.join(snapshot_dir, f"{name}.pkl")
+    try:
+        with open(snapshot_path, 'rb') as file:
+            snapshot = pickle.load(file)
+        if snapshot.get('key') == key:
+            return snapshot['data']
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        pass  # 快照缺失或损坏时重新构建
+
+    data = build()
+    try:
+        os.makedirs(snapshot_dir, exist_ok=True)
+        with atomic_write(snapshot_path) as file:
+            pickle.dump({'key': key, 'data': data}, file, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError as e:
+        logger.warning("Error while writing snapshot %s: %s", snapshot_path, e)
+    return data
+
+
+@contextmanager
+def atomic_write(file_path):
+    """
+    以二进制方式写入 file_path：先写同目录下本次独有的临时文件，成功后再整体替换目标文件。
+    多个进程同时重建同一文件时各写各的临时文件，读取方只会看到某一次完整的结果；写入失败时删除临时文件。
+    """
+    directory, name = os.path.split(file_path)
+    fd, tmp_path = tempfile.mkstemp(prefix=name + '.', suffix='.tmp', dir=directory or '.')
+    os.chmod(tmp_path, 0o644)  # mkstemp 创建的文件只有属主可读
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            yield out
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def save_arrays(file_path, arrays, key=''):
+    """
+    把 {名称: 数组} 写入一个文件：8 字节的头部长度、JSON 头部（键、各数组的类型、形状和偏移），
+    之后是按 _ALIGN 对齐的原始数据。通过 atomic_write 写入，读取方不会看到写了一半的文件。
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = [array.dtype.str, list(array.shape), offset]
+        offset += -(-array.nbytes // _ALIGN) * _ALIGN
+    header = json.dumps({'key': key, 'arrays': layout}).encode('utf-8')
+    data_start = -(-(8 + len(header)) // _ALIGN) * _ALIGN
+    with atomic_write(file_path) as out:
+        out.write(len(header).to_bytes(8, 'little'))
+        out.write(header)
+        for name, array in arrays.items():
+            out.seek(data_start + layout[name][2])
+            out.write(array.tobytes())
+        out.truncate(data_start + offset)
+
+
+def load_arrays(file_path):
+    """
+    以只读内存映射方式打开 save_arrays 写出的文件，数据按需从页缓存读入，同一文件在所有进程中只占一份物理内存。
+
+    :return: (键, {名称: 只读数组})
+    """
+    with open(file_path, 'rb') as file:
+        size = int.from_bytes(file.read(8), 'little')
+        header = json.loads(file.read(size).decode('utf-8'))
+    data_start = -(-(8 + size) // _ALIGN) * _ALIGN
+    buffer = np.memmap(file_path, dtype=np.uint8, mode='r')
+    arrays = {}
+    for name, (dtype, shape, offset) in header['arrays'].items():
+        dtype = np.dtype(dtype)
+        start = data_start + offset
+        count = int(np.prod(shape, dtype=np.int64))
+        arrays[name] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(shape)
+    return header['key'], arrays
+
+
+def load_frozen(name, sources, build, snapshot_dir=SNAPSHOT_DIR):
+    """
+    与 load_cached 相同，但数据为 {名称: NumPy 数组}，保存为 <name>.arrays 并以内存映射方式返回。
+
+    :param build: 无参数的构建函数，返回 {名称: 数组}
+    :return: {名称: 只读数组}
+    """
+    key = source_key(sources)
+    file_path = os.path.join(snapshot_dir, f"{name}.arrays")
+    try:
+        stored_key, arrays = load_arrays(file_path)
+        if stored_key == key:
+            return arrays
+    except (OSError, ValueError, KeyError, TypeError):
+        pass  # 文件缺失或损坏时重新构建
+
+    arrays = build()
+    try:
+        os.makedirs(snapshot_dir, exist_ok=True)
+        save_arrays(file_path, arrays, key)
+        # 重新以内存映射方式打开；其间其他进程可能已替换为另一次构建的结果，键不同时仍用内存中的数组
+        stored_key, mapped = load_arrays(file_path)
+        if stored_key == key:
+            return mapped
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning("Error while writing frozen arrays %s: %s", file_path, e)
+    return arrays
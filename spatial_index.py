@@ -0,0 +1,110 @@
+import math
+
+import numpy as np
+
+EARTH_RADIUS = 6371008.8  # 地球平均半径（米）
+# 网格边长（度），约 1 公里，西安范围内的景点分布在几千个格子里
+CELL_DEGREES = 0.01
+_METERS_PER_DEGREE = math.pi * EARTH_RADIUS / 180
+
+
+def haversine(lat, lon, lats, lons):
+    """
+    向量化的球面距离（米）：一个点 (lat, lon) 到一组点 (lats, lons) 的距离，坐标单位为度。
+    """
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class SpatialIndex:
+    """
+    景点坐标的网格索引。景点按 (行, 列) 格子编号排序存放，同一行中相邻格子的景点在数组中连续，
+    半径查询只需对覆盖范围内的每一行取一次切片，再对候选点做一次向量化的 haversine。
+    """
+
+    def __init__(self, attractions, cell_degrees=CELL_DEGREES):
+        self.attractions = attractions
+        self.cell = cell_degrees
+        codes = list(attractions)
+        lats = np.array([attractions[code].lat for code in codes], dtype=float)
+        lons = np.array([attractions[code].lon for code in codes], dtype=float)
+        if len(codes):
+            self.lat0, self.lon0 = lats.min(), lons.min()
+            self.rows = int((lats.max() - self.lat0) // cell_degrees) + 1
+            self.cols = int((lons.max() - self.lon0) // cell_degrees) + 1
+        else:
+            self.lat0 = self.lon0 = 0.0
+            self.rows = self.cols = 0
+        cells = self._row(lats) * self.cols + self._col(lons)
+        order = np.argsort(cells, kind='stable')
+        self.codes = [codes[i] for i in order]
+        self.lats, self.lons = lats[order], lons[order]
+        # starts[k] 为第 k 个格子的第一个景点在数组中的位置
+        self.starts = np.searchsorted(cells[order], np.arange(self.rows * self.cols + 1))
+
+    def _row(self, lats):
+        return ((np.asarray(lats) - self.lat0) // self.cell).astype(np.int64)
+
+    def _col(self, lons):
+        return ((np.asarray(lons) - self.lon0) // self.cell).astype(np.int64)
+
+    def _candidates(self, lat, lon, radius):
+        # 覆盖以 (lat, lon) 为中心、radius 米为半径的外接矩形的所有格子中的景点下标
+        dlat = radius / _METERS_PER_DEGREE
+        dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+        row0 = max(int(self._row(lat - dlat)), 0)
+        row1 = min(int(self._row(lat + dlat)), self.rows - 1)
+        col0 = max(int(self._col(lon - dlon)), 0)
+        col1 = min(int(self._col(lon + dlon)), self.cols - 1)
+        if row0 > row1 or col0 > col1:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([
+            np.arange(self.starts[row * self.cols + col0], self.starts[row * self.cols + col1 + 1])
+            for row in range(row0, row1 + 1)
+        ])
+
+    def _result(self, indices, distances):
+        order = np.argsort(distances, kind='stable')
+        return [(self.attractions[self.codes[indices[i]]], float(distances[i])) for i in order]
+
+    def within(self, lat, lon, radius):
+        """
+        返回距离 (lat, lon) 不超过 radius 米的景点。
+
+        :return: [(景点, 距离米), ...]，按距离从近到远排列
+        """
+        if not self.codes or not radius >= 0:
+            return []
+        radius = min(radius, math.pi * EARTH_RADIUS)  # 半个周长已覆盖整个地球
+        indices = self._candidates(lat, lon, radius)
+        distances = haversine(lat, lon, self.lats[indices], self.lons[indices])
+        inside = distances <= radius
+        return self._result(indices[inside], distances[inside])
+
+    def nearest(self, lat, lon, count=5):
+        """
+        返回离 (lat, lon) 最近的 count 个景点。从一个格子的半径开始查找，候选不足时半径加倍，
+        找到 count 个时它们一定是最近的；半径超出全部网格时直接计算所有景点。
+
+        :return: [(景点, 距离米), ...]，按距离从近到远排列
+        """
+        if not self.codes or count <= 0:
+            return []
+        radius = self.cell * _METERS_PER_DEGREE
+        # 网格对角线加上查询点到网格的距离，超过它的半径一定覆盖全部景点
+        span = haversine(self.lat0, self.lon0, self.lat0 + self.rows * self.cell, self.lon0 + self.cols * self.cell)
+        far = span + float(haversine(lat, lon, self.lat0, self.lon0))
+        while radius < far:
+            indices = self._candidates(lat, lon, radius)
+            if len(indices) >= count:
+                distances = haversine(lat, lon, self.lats[indices], self.lons[indices])
+                inside = np.flatnonzero(distances <= radius)
+                if len(inside) >= count:
+                    nearest = inside[np.argsort(distances[inside], kind='stable')[:count]]
+                    return self._result(indices[nearest], distances[nearest])
+            radius *= 2
+        distances = haversine(lat, lon, self.lats, self.lons)
+        nearest = np.argsort(distances, kind='stable')[:count]
+        return self._result(nearest, distances[nearest])
@@ -0,0 +1,70 @@
+"""
+ToGPS 向量化转换的回归测试：gcj02_to_wgs84_array 与逐点的 gcj02_to_wgs84 结果一致。
+
+用法（在仓库根目录执行）：python -m pytest -q
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ToGPS import batch_gcj02_to_wgs84, gcj02_to_wgs84, gcj02_to_wgs84_array, out_of_china  # noqa: E402
+
+TOLERANCE = 1e-9
+
+# 西安附近的点，以及经度或纬度越界的境外点
+INSIDE = [(108.963798, 34.217977), (108.940174, 34.341568), (116.397128, 39.916527), (72.1, 1.0)]
+OUTSIDE = [(-0.127758, 51.507351), (139.691706, 35.689487), (100.0, 60.0), (0.0, 0.0), (151.2093, -33.8688)]
+
+
+def random_points(count=2000, seed=0):
+    # 境内随机点中每隔 10 个混入一个境外点，覆盖两个分支
+    rng = np.random.default_rng(seed)
+    points = np.column_stack([rng.uniform(73.0, 135.0, count), rng.uniform(1.0, 55.0, count)])
+    points[::10] = rng.uniform([-180.0, -90.0], [70.0, 0.0], (len(points[::10]), 2))
+    return points
+
+
+def scalar_convert(points):
+    return np.array([gcj02_to_wgs84(lon, lat) for lon, lat in np.asarray(points).tolist()])
+
+
+@pytest.mark.parametrize('points', [np.array(INSIDE + OUTSIDE), random_points()], ids=['fixed', 'random'])
+def test_lon_lat_matches_scalar(points):
+    actual = gcj02_to_wgs84_array(points, "lon_lat")
+    np.testing.assert_allclose(actual, scalar_convert(points), rtol=0, atol=TOLERANCE)
+
+
+@pytest.mark.parametrize('points', [np.array(INSIDE + OUTSIDE), random_points()], ids=['fixed', 'random'])
+def test_lat_lon_matches_scalar(points):
+    # (纬度, 经度) 输入时输出的列顺序与输入一致
+    actual = gcj02_to_wgs84_array(points[:, ::-1], "lat_lon")[:, ::-1]
+    np.testing.assert_allclose(actual, scalar_convert(points), rtol=0, atol=TOLERANCE)
+
+
+@pytest.mark.parametrize('coord_format', ['lon_lat', 'lat_lon'])
+def test_outside_china_unchanged(coord_format):
+    points = np.array(OUTSIDE)
+    assert all(out_of_china(lon, lat) for lon, lat in OUTSIDE)
+    if coord_format == 'lat_lon':
+        points = points[:, ::-1]
+    np.testing.assert_array_equal(gcj02_to_wgs84_array(points, coord_format), points)
+
+
+def test_inside_china_shifted():
+    actual = gcj02_to_wgs84_array(np.array(INSIDE[:3]))
+    assert np.all(np.abs(actual - np.array(INSIDE[:3])) > 1e-5)
+
+
+def test_batch_keeps_input_type():
+    assert isinstance(batch_gcj02_to_wgs84(INSIDE), list)
+    np.testing.assert_allclose(batch_gcj02_to_wgs84(INSIDE), scalar_convert(INSIDE), rtol=0, atol=TOLERANCE)
+    assert isinstance(batch_gcj02_to_wgs84(np.array(INSIDE)), np.ndarray)
+
+
+def test_invalid_format():
+    with pytest.raises(ValueError):
+        gcj02_to_wgs84_array(INSIDE, "xy")
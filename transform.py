@@ -1,11 +1,31 @@
+import os
 import sqlite3
-import re
+import time
+
+import numpy as np
 from tqdm import tqdm
 
-def init_database():
-    """初始化数据库结构（包含坐标转换支持）"""
-    conn = sqlite3.connect('attractions.db')
+from functions import load_attractions
+from polyline_store import iter_road_file
+from route_parser import iter_route_records
+from ToGPS import gcj02_to_wgs84_array
+
+# 表结构版本，记录在 PRAGMA user_version 中；表结构变化时加 1
+SCHEMA_VERSION = 2
+
+
+def init_database(db_path='attractions.db'):
+    """初始化数据库结构（包含坐标转换支持）；已有数据库的表结构版本不同时删表重建"""
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
+    # WAL 模式下读写互不阻塞，多个进程可以同时读取同一个数据库
+    cursor.execute('PRAGMA journal_mode=WAL')
+
+    # 旧版数据库缺少后来增加的列和取值，CREATE TABLE IF NOT EXISTS 不会更新它们；
+    # 数据总是从文本文件完整导入，直接删掉旧表即可
+    if cursor.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+        for table in ('path_points', 'routes', 'attractions'):
+            cursor.execute(f'DROP TABLE IF EXISTS {table}')
     
     # 创建景点表（增强版）
     cursor.execute('''
@@ -26,12 +46,18 @@ def init_database():
         origin_id TEXT NOT NULL,
         dest_id TEXT NOT NULL,
         mode TEXT CHECK(mode IN ('bus', 'drive', 'walk')) NOT NULL,
-        strategy TEXT CHECK(strategy IN ('eco', 'fw', 'hc', NULL)),
+        strategy TEXT CHECK(strategy IN ('eco', 'fw', 'hc', 'quick', NULL)),
         distance INTEGER CHECK(distance > 0),
         duration INTEGER CHECK(duration > 0),
         cost REAL CHECK(cost >= 0),
+        taxi_cost REAL,
+        walking_distance INTEGER,
         bus_name TEXT,
         transfers INTEGER CHECK(transfers >= 0),
+        origin_lng REAL,
+        origin_lat REAL,
+        dest_lng REAL,
+        dest_lat REAL,
         FOREIGN KEY (origin_id) REFERENCES attractions(id),
         FOREIGN KEY (dest_id) REFERENCES attractions(id)
     )''')
@@ -49,136 +75,150 @@ def init_database():
     
     # 创建加速索引
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_routes_main ON routes(origin_id, dest_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_routes_lookup ON routes(mode, strategy, origin_id, dest_id)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_path_points ON path_points(route_id)')
+    cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
     
     conn.commit()
     return conn
 
+# 路线文件 -> (交通方式, 数据库中的方案编码, 对应的折线文件)
+ROUTE_FILES = [
+    ('data/walk.txt', 'walk', None, 'data/walk_2.0.txt'),
+    ('data/drive.txt', 'drive', None, 'data/drive_road.txt'),
+    ('data/bus_eco.txt', 'bus', 'eco', 'data/bus_road_eco.txt'),
+    ('data/bus_fw.txt', 'bus', 'fw', 'data/bus_road_fw.txt'),
+    ('data/bus_hc.txt', 'bus', 'hc', 'data/bus_road_hc.txt'),
+    ('data/bus_quick.txt', 'bus', 'quick', 'data/bus_road_quick.txt'),
+]
+
+
+def _to_number(value, default=None):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default  # 如 bus_cost 为 '[]' 表示没有票价信息
+
+
 class DataLoader:
     def __init__(self, conn):
         self.conn = conn
         self.cursor = conn.cursor()
-        self.coord_cache = {}  # 坐标转换缓存
+        self.route_ids = {}  # (mode, strategy, 起点, 终点) -> route_id，用于关联折线
+        self.skipped = 0  # 解析失败或不满足约束而跳过的行数
         
-    def _convert_coord(self, lng, lat):
-        """坐标转换逻辑（示例实现）"""
-        # 此处应替换为实际的gcj02_to_wgs84实现
-        return lng, lat  # 示例直接返回原始坐标
+    def _convert_coords(self, points):
+        """批量将 GCJ-02 (经度, 纬度) 转换为 WGS-84，返回 (N, 2) 数组"""
+        return gcj02_to_wgs84_array(points, coord_format="lon_lat")
 
     def load_attractions(self, file_path):
-        """加载景点数据（增强版）"""
-        pattern = re.compile(r'''
-            ^([^,]+?),        # 景点名称
-            ([A-Z0-9]{4,}),   # 景点编码
-            \(([\d.]+),       # 经度
-            ([\d.]+)\),       # 纬度
-            '([^']*)',        # 描述
-            '([^']*)',        # 票价信息
-            '([^']*)'         # 官网链接
-        ''', re.X)
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in tqdm(f, desc='加载景点数据'):
-                match = pattern.match(line.strip())
-                if not match: continue
-                
-                name, code, lng, lat, desc, price, url = match.groups()
-                conv_lng, conv_lat = self._convert_coord(float(lng), float(lat))
-                
-                self.cursor.execute('''
-                    INSERT OR REPLACE INTO attractions 
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (code, name, conv_lng, conv_lat, desc, price, url))
-        
-        self.conn.commit()
+        """加载景点数据（与 app 使用同一解析逻辑，景点坐标已是 WGS-84）"""
+        attractions = load_attractions(file_path)
+        self.cursor.executemany('''
+            INSERT OR REPLACE INTO attractions 
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [
+            (a.code, a.name, a.lon, a.lat, a.description, a.price, a.link)
+            for a in attractions.values()
+        ])
     
-    def _parse_path_line(self, line):
-        """通用路径解析方法"""
-        base_pattern = re.compile(r'''
-            (.+?)\(([A-Z0-9]+)\)\s+to\s+   # 起点
-            (.+?)\(([A-Z0-9]+)\)\s*,\s*    # 终点
-            \{([^}]+)\}                    # 属性字典
-        ''', re.X)
-        
-        match = base_pattern.match(line.strip())
-        if not match: return None
-        
-        from_name, from_code, to_name, to_code, props_str = match.groups()
-        props = {}
-        
-        # 解析属性字典
-        for pair in props_str.split(','):
-            key, value = pair.split(':', 1)
-            props[key.strip(" '")] = value.strip(" '")
-        
-        return {
-            'from_code': from_code,
-            'to_code': to_code,
-            'props': props
-        }
-    
-    def load_routes(self, file_path, mode):
-        """加载路线数据（支持多模式）"""
-        strategy_map = {
-            'bus_eco.txt': 'eco',
-            'bus_fw.txt': 'fw',
-            'bus_hc.txt': 'hc'
-        }
-        
-        # 确定策略类型
-        strategy = strategy_map.get(file_path.split('/')[-1]) if mode == 'bus' else None
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in tqdm(f, desc=f'加载{mode}数据'):
-                data = self._parse_path_line(line)
-                if not data: continue
-                
-                # 解析坐标
-                origin_lng, origin_lat = map(float, data['props']['origin'].split(','))
-                dest_lng, dest_lat = map(float, data['props']['destination'].split(','))
-                
-                # 插入路线
-                self.cursor.execute('''
-                    INSERT INTO routes (
-                        origin_id, dest_id, mode, strategy,
-                        distance, duration, cost, bus_name, transfers
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    data['from_code'],
-                    data['to_code'],
-                    mode,
-                    strategy,
-                    int(data['props']['distance']),
-                    int(data['props']['duration']),
-                    self._parse_cost(data['props'], mode),
-                    data['props'].get('bus_name'),
-                    int(data['props'].get('huanchen', 0)) if mode == 'bus' else 0
-                ))
-                
-                # 插入路径点
-                route_id = self.cursor.lastrowid
-                if 'polylines' in data['props']:
-                    points = [
-                        tuple(map(float, p.split(','))) 
-                        for p in data['props']['polylines'].split(';')
-                    ]
-                    for seq, (lng, lat) in enumerate(points):
-                        conv_lng, conv_lat = self._convert_coord(lng, lat)
-                        self.cursor.execute('''
-                            INSERT INTO path_points 
-                            VALUES (?, ?, ?, ?)
-                        ''', (route_id, seq, conv_lng, conv_lat))
-        
-        self.conn.commit()
+    def load_routes(self, file_path, mode, strategy=None):
+        """流式解析一个路线文件，批量写入 routes（坐标统一向量化转换）"""
+        rows = []
+        raw_points = []
+        errors = []  # 格式不对的行，解析器已按行号记录警告
+        for record in tqdm(iter_route_records(file_path, errors), desc=f'加载{mode}数据'):
+            if record.distance <= 0 or record.duration <= 0:
+                self.skipped += 1  # 不满足表约束
+                continue
+            props = record.props
+            raw_points.append(record.origin)
+            raw_points.append(record.destination)
+            rows.append([
+                record.from_code, record.to_code, mode, strategy, record.distance, record.duration,
+                self._parse_cost(props, mode),
+                _to_number(props.get('taxi_cost')),
+                int(props['walking_distance']) if 'walking_distance' in props else None,
+                props.get('bus_name'),
+                int(props.get('huanchen', 0)) if mode == 'bus' else 0,
+            ])
+        self.skipped += len(errors)
+
+        # 预先分配连续的 route_id，便于之后批量写入路径点
+        # 起终点与 functions.load_paths 一致，保留 6 位小数
+        converted = np.round(self._convert_coords(raw_points), 6).tolist()
+        next_id = (self.cursor.execute('SELECT COALESCE(MAX(id), 0) FROM routes').fetchone()[0]) + 1
+        for offset, row in enumerate(rows):
+            route_id = next_id + offset
+            key = (mode, strategy, row[0], row[1])
+            self.route_ids.setdefault(key, route_id)
+            row.insert(0, route_id)
+            row.extend(converted[2 * offset] + converted[2 * offset + 1])
+        self.cursor.executemany('''
+            INSERT INTO routes (
+                id, origin_id, dest_id, mode, strategy,
+                distance, duration, cost, taxi_cost, walking_distance, bus_name, transfers,
+                origin_lng, origin_lat, dest_lng, dest_lat
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        return len(rows)
+
+    def load_polylines(self, file_path, mode, strategy=None):
+        """读取折线文件，按 (起点, 终点) 关联到已写入的路线，整体转换坐标后批量写入 path_points"""
+        route_ids = []
+        seen = set()
+        counts = []
+        chunks = []
+        for origin, destination, coordinates in tqdm(iter_road_file(file_path), desc=f'加载{mode}折线'):
+            route_id = self.route_ids.get((mode, strategy, origin, destination))
+            if route_id is None or route_id in seen:
+                continue
+            seen.add(route_id)
+            route_ids.append(route_id)
+            counts.append(len(coordinates))
+            chunks.append(coordinates)
+        if not chunks:
+            return 0
+
+        converted = self._convert_coords(np.concatenate(chunks))
+        route_column = np.repeat(route_ids, counts)
+        seq_column = np.concatenate([np.arange(count) for count in counts])
+        self.cursor.executemany(
+            'INSERT INTO path_points VALUES (?, ?, ?, ?)',
+            zip(route_column.tolist(), seq_column.tolist(), converted[:, 0].tolist(), converted[:, 1].tolist()))
+        return len(converted)
     
     def _parse_cost(self, props, mode):
         """统一费用解析逻辑"""
         cost_map = {
-            'bus': lambda p: float(p.get('bus_cost', 0)),
-            'drive': lambda p: float(p.get('taxi_cost', 0)),
+            'bus': lambda p: _to_number(p.get('bus_cost', 0)),
+            'drive': lambda p: _to_number(p.get('taxi_cost', 0), 0.0),
             'walk': lambda _: 0.0
         }
         return cost_map[mode](props)
+
+    def rebuild(self, attractions_file, route_files=ROUTE_FILES):
+        """清空后重新导入全部数据，整个过程在一个事务内完成"""
+        self.route_ids.clear()
+        self.skipped = 0
+        self.cursor.execute('PRAGMA synchronous=OFF')
+        self.cursor.execute('PRAGMA cache_size=-262144')  # 256MB 页缓存
+        with self.conn:
+            # 批量写入期间去掉冗余的二级索引，写完后再重建
+            self.cursor.execute('DROP INDEX IF EXISTS idx_path_points')
+            self.cursor.execute('DELETE FROM path_points')
+            self.cursor.execute('DELETE FROM routes')
+            self.cursor.execute('DELETE FROM attractions')
+            self.load_attractions(attractions_file)
+            for file_path, mode, strategy, road_file in route_files:
+                if not os.path.exists(file_path):
+                    print(f"File {file_path} not found.")
+                    continue
+                self.load_routes(file_path, mode, strategy)
+                if road_file and os.path.exists(road_file):
+                    self.load_polylines(road_file, mode, strategy)
+            self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_path_points ON path_points(route_id)')
+        self.cursor.execute('PRAGMA synchronous=FULL')
     
 def main():
     # 初始化数据库
@@ -186,21 +226,9 @@ def main():
     loader = DataLoader(conn)
     
     try:
-        # 加载景点数据
-        loader.load_attractions('data\\attractions_summary.txt')
-        
-        # 加载不同交通方式数据
-        transport_modes = [
-            ('data\\bus_eco.txt', 'bus'),
-            ('data\\bus_fw.txt', 'bus'),
-            ('data\\bus_hc.txt', 'bus'),
-            ('data\\drive.txt', 'drive'),
-            ('data\walk.txt', 'walk')
-        ]
-        
-        for file_path, mode in transport_modes:
-            loader.load_routes(file_path, mode)
-            
+        start = time.perf_counter()
+        loader.rebuild('data/attractions_summary.txt')
+        print(f"导入完成，用时 {time.perf_counter() - start:.1f}s，跳过 {loader.skipped} 行")
     finally:
         conn.close()
 
@@ -0,0 +1,453 @@
+import random
+import threading
+import time
+
+import numpy as np
+
+# 精确求解允许的最大中间点数量，超过后状态表内存增长过快
+HELD_KARP_MAX_STOPS = 18
+
+# 每次向量化处理的子集数量，用来限制中间数组的内存
+_CHUNK = 4096
+
+_local = threading.local()
+
+
+class SolveCancelled(Exception):
+    """求解被取消，例如发起请求的客户端已经断开"""
+
+
+def set_cancel_check(check):
+    """
+    为当前线程设置取消检查函数，求解过程中定期调用，返回 True 时抛出 SolveCancelled。
+    传入 None 取消设置。
+    """
+    _local.cancel_check = check
+
+
+def _check_cancelled():
+    check = getattr(_local, 'cancel_check', None)
+    if check is not None and check():
+        raise SolveCancelled()
+
+
+def held_karp(cost):
+    """
+    Held–Karp 状态压缩动态规划，求固定起点、固定终点的最短哈密顿路径。
+
+    :param cost: (n, n) 代价矩阵，第 0 个节点为起点，最后一个节点为终点，其余为中间点；
+                 没有路线的位置为 inf
+    :return: (访问顺序, 总代价)。访问顺序为节点下标列表，不含起点、以终点结尾；
+             找不到可行路线时返回 ([], inf)
+    """
+    return held_karp_batch(np.asarray(cost, dtype=float)[None])[0]
+
+
+def held_karp_batch(costs):
+    """
+    对 K 个同样大小的代价矩阵同时做 Held–Karp，所有矩阵共享同一遍子集枚举。
+    用于多目标规划：每个矩阵是一组目标权重下的加权代价。
+
+    :param costs: (K, n, n) 代价矩阵
+    :return: 长度为 K 的列表，每项为 held_karp 的返回值
+    """
+    costs = np.asarray(costs, dtype=float)
+    batch, n = costs.shape[0], costs.shape[1]
+    end = n - 1
+    m = n - 2  # 中间点数量
+    if m < 0:
+        raise ValueError("代价矩阵至少需要包含起点和终点")
+    if m > HELD_KARP_MAX_STOPS:
+        raise ValueError(f"中间点数量 {m} 超过精确求解上限 {HELD_KARP_MAX_STOPS}")
+    if m == 0:
+        return [([end], float(total)) if np.isfinite(total) else ([], float('inf')) for total in costs[:, 0, end]]
+
+    # mid_cost_t[b, j, i] = cost[b, i -> j]
+    mid_cost_t = costs[:, 1:end, 1:end].transpose(0, 2, 1)
+    # dp[b, mask, j]：从起点出发、恰好访问 mask 中的中间点、最后停在 j 的最小代价
+    size = 1 << m
+    dp = np.full((batch, size, m), np.inf)
+    parent = np.zeros((batch, size, m), dtype=np.int8)
+    bits = 1 << np.arange(m)
+    dp[:, bits, np.arange(m)] = costs[:, 0, 1:end]
+
+    masks = np.arange(size)
+    popcount = np.zeros(size, dtype=np.int8)
+    for j in range(m):
+        popcount += (masks >> j) & 1
+
+    # 按子集大小逐层转移，同层之间互不依赖，可以整体向量化
+    chunk_size = max(1, _CHUNK // batch)
+    for k in range(2, m + 1):
+        layer = np.flatnonzero(popcount == k)
+        for chunk_start in range(0, len(layer), chunk_size):
+            _check_cancelled()
+            chunk = layer[chunk_start:chunk_start + chunk_size]
+            # prev[s, j] 为去掉 j 之后的子集；j 不在子集中时得到的是未计算的更大子集，值为 inf
+            prev = chunk[:, None] ^ bits[None, :]
+            # candidate[b, s, j, i] = dp[b, prev[s, j], i] + cost[b, i -> j]
+            candidate = dp[:, prev] + mid_cost_t[:, None, :, :]
+            best = candidate.argmin(axis=3)
+            dp[:, chunk] = np.take_along_axis(candidate, best[..., None], axis=3)[..., 0]
+            parent[:, chunk] = best
+
+    full = size - 1
+    results = []
+    for b in range(batch):
+        totals = dp[b, full] + costs[b, 1:end, end]
+        last = int(totals.argmin())
+        total = float(totals[last])
+        if not np.isfinite(total):
+            results.append(([], float('inf')))
+            continue
+
+        # 回溯访问顺序
+        order = []
+        mask = full
+        while mask:
+            order.append(last + 1)
+            previous = int(parent[b, mask, last])
+            mask ^= 1 << last
+            last = previous
+        order.reverse()
+        order.append(end)
+        results.append((order, total))
+    return results
+
+
+# 自动模式下使用精确解的中间点上限，超过后改用启发式以保证响应时间
+AUTO_EXACT_STOPS = 12
+# 启发式求解默认的时间预算（毫秒）
+DEFAULT_BUDGET_MS = 200
+# 时间预算上限（毫秒），请求中给出的预算超过时按此截断
+MAX_BUDGET_MS = 2000
+# 连续这么多次随机扰动都没有得到更好的解时提前结束，不必用完全部预算
+MAX_STALLED_RESTARTS = 50
+# 多交通方式精确求解的中间点上限：每次转移的计算量和内存是单一方式的 M² 倍（M 为方式数），
+# 不能沿用 HELD_KARP_MAX_STOPS，取自动模式的上限
+HELD_KARP_MODES_MAX_STOPS = AUTO_EXACT_STOPS
+
+
+def _path_cost(cost, seq):
+    return sum(cost[a][b] for a, b in zip(seq, seq[1:]))
+
+
+def path_lower_bound(cost):
+    """
+    固定起点终点哈密顿路径的下界：每个非终点节点至少要出发一次，每个非起点节点至少要到达一次，
+    分别取最小出边之和与最小入边之和中较大的一个。
+    """
+    cost = np.asarray(cost, dtype=float)
+    n = len(cost)
+    if n <= 2:
+        return float(cost[0, n - 1]) if n == 2 else 0.0
+    masked = cost.copy()
+    np.fill_diagonal(masked, np.inf)
+    masked[0, n - 1] = np.inf  # 有中间点时起点不能直达终点
+    # 行为起点和中间点（出发方），列为中间点和终点（到达方）
+    candidates = masked[:-1, 1:]
+    out_bound = candidates.min(axis=1).sum()
+    in_bound = candidates.min(axis=0).sum()
+    return float(max(out_bound, in_bound))
+
+
+def _nearest_neighbour(cost, n):
+    end = n - 1
+    seq = [0]
+    unvisited = set(range(1, end))
+    while unvisited:
+        current = seq[-1]
+        nxt = min(unvisited, key=lambda j: cost[current][j])
+        seq.append(nxt)
+        unvisited.remove(nxt)
+    seq.append(end)
+    return seq
+
+
+def _two_opt_pass(cost, seq, deadline, clock):
+    """在固定首尾的路径上做一轮 2-opt（非对称代价下反转片段需重新计算片段内部代价）"""
+    n = len(seq)
+    forward = [0.0] * n
+    backward = [0.0] * n
+    for t in range(1, n):
+        forward[t] = forward[t - 1] + cost[seq[t - 1]][seq[t]]
+        backward[t] = backward[t - 1] + cost[seq[t]][seq[t - 1]]
+    for i in range(1, n - 2):
+        if clock() > deadline:
+            return False
+        a, s_i = seq[i - 1], seq[i]
+        for k in range(i + 1, n - 1):
+            s_k, b = seq[k], seq[k + 1]
+            old = cost[a][s_i] + (forward[k] - forward[i]) + cost[s_k][b]
+            new = cost[a][s_k] + (backward[k] - backward[i]) + cost[s_i][b]
+            if new < old - 1e-9:
+                seq[i:k + 1] = reversed(seq[i:k + 1])
+                return True
+    return False
+
+
+def _or_opt_pass(cost, seq, deadline, clock):
+    """把长度为 1~3 的连续片段整体挪到其它位置"""
+    n = len(seq)
+    for length in (1, 2, 3):
+        for i in range(1, n - length):
+            if clock() > deadline:
+                return False
+            j = i + length - 1  # 片段为 seq[i..j]
+            if j >= n - 1:
+                break
+            prev, nxt = seq[i - 1], seq[j + 1]
+            first, last = seq[i], seq[j]
+            removed = cost[prev][first] + cost[last][nxt] - cost[prev][nxt]
+            for p in range(0, n - 1):
+                if i - 1 <= p <= j:
+                    continue
+                u, v = seq[p], seq[p + 1]
+                added = cost[u][first] + cost[last][v] - cost[u][v]
+                if added < removed - 1e-9:
+                    segment = seq[i:j + 1]
+                    del seq[i:j + 1]
+                    insert_at = p + 1 if p < i else p + 1 - length
+                    seq[insert_at:insert_at] = segment
+                    return True
+    return False
+
+
+def heuristic_path(cost, budget_ms=DEFAULT_BUDGET_MS, seed=0):
+    """
+    近邻法构造初始路径，再用 2-opt / Or-opt 局部搜索改进，到达时间预算后返回当前最优解。
+    局部最优后若仍有剩余时间，则随机扰动后继续搜索；达到下界（已证明最优）或连续
+    MAX_STALLED_RESTARTS 次扰动没有改进时提前返回。
+
+    :param cost: 与 held_karp 相同的代价矩阵
+    :param budget_ms: 时间预算（毫秒），超过 MAX_BUDGET_MS 时按 MAX_BUDGET_MS 计
+    :return: (访问顺序, 总代价, 最优性差距估计)。差距为相对下界的比例，0 表示已证明最优
+    """
+    cost = np.asarray(cost, dtype=float)
+    n = len(cost)
+    if n < 2:
+        raise ValueError("代价矩阵至少需要包含起点和终点")
+    clock = time.perf_counter
+    deadline = clock() + min(budget_ms, MAX_BUDGET_MS) / 1000.0
+    lower = path_lower_bound(cost)
+
+    # 不可达的边用一个足够大的有限值代替，保证局部搜索的差值计算有意义
+    finite = cost[np.isfinite(cost)]
+    penalty = (finite.max() + 1.0) * n if finite.size else 1.0
+    search_cost = np.where(np.isfinite(cost), cost, penalty).tolist()
+
+    seq = _nearest_neighbour(search_cost, n)
+    best_seq, best_total = list(seq), _path_cost(search_cost, seq)
+    rng = random.Random(seed)
+    stalled = 0
+    while clock() < deadline:
+        _check_cancelled()
+        improved = _two_opt_pass(search_cost, seq, deadline, clock) or \
+            _or_opt_pass(search_cost, seq, deadline, clock)
+        if improved:
+            continue
+        total = _path_cost(search_cost, seq)
+        if total < best_total - 1e-9:
+            best_seq, best_total = list(seq), total
+            stalled = 0
+        else:
+            stalled += 1
+        if n < 5:
+            break  # 中间点不超过 2 个时局部最优即全局最优
+        if best_total <= lower + 1e-9 or stalled >= MAX_STALLED_RESTARTS:
+            break  # 差距已为 0，或继续扰动也难有改进
+        # 随机交换两段后重新搜索
+        i, k = sorted(rng.sample(range(1, n - 1), 2))
+        seq = list(best_seq)
+        seq[i], seq[k] = seq[k], seq[i]
+    total = _path_cost(search_cost, seq)
+    if total < best_total:
+        best_seq, best_total = list(seq), total
+
+    total = _path_cost(cost, best_seq)
+    if not np.isfinite(total):
+        return [], float('inf'), None
+    gap = (total - lower) / total if total > 0 else 0.0
+    return best_seq[1:], float(total), float(max(gap, 0.0))
+
+
+def solve_path(cost, solver='auto', budget_ms=None):
+    """
+    按 solver 选择求解方式：'exact' 为 Held–Karp，'heuristic' 为带时间预算的局部搜索，
+    'auto' 在中间点不超过 AUTO_EXACT_STOPS 时用精确解，否则用启发式。
+
+    :return: (访问顺序, 总代价, 实际使用的求解方式, 最优性差距估计)
+    """
+    stops = len(cost) - 2
+    if solver == 'auto':
+        solver = 'exact' if stops <= AUTO_EXACT_STOPS else 'heuristic'
+    if solver == 'exact':
+        order, total = held_karp(cost)
+        return order, total, solver, 0.0 if order else None
+    if solver == 'heuristic':
+        order, total, gap = heuristic_path(cost, budget_ms if budget_ms is not None else DEFAULT_BUDGET_MS)
+        return order, total, solver, gap
+    raise ValueError(f"未知的求解方式: {solver}")
+
+
+def solve_path_multi(costs, solver='auto', budget_ms=None):
+    """
+    同时求解 K 组代价矩阵（例如同一行程在不同目标权重下的加权代价）。
+    精确模式下所有矩阵共享一遍 Held–Karp；启发式模式下时间预算在各矩阵之间平均分配。
+
+    :param costs: (K, n, n) 代价矩阵
+    :return: 长度为 K 的列表，每项为 solve_path 的返回值
+    """
+    costs = np.asarray(costs, dtype=float)
+    stops = costs.shape[1] - 2
+    if solver == 'auto':
+        solver = 'exact' if stops <= AUTO_EXACT_STOPS else 'heuristic'
+    if solver == 'exact':
+        return [(order, total, solver, 0.0 if order else None) for order, total in held_karp_batch(costs)]
+    if solver == 'heuristic':
+        budget = (budget_ms if budget_ms is not None else DEFAULT_BUDGET_MS) / len(costs)
+        results = []
+        for cost in costs:
+            order, total, gap = heuristic_path(cost, budget)
+            results.append((order, total, solver, gap))
+        return results
+    raise ValueError(f"未知的求解方式: {solver}")
+
+
+def assign_modes(costs, penalty, sequence):
+    """
+    在访问顺序固定时，为每一段选择交通方式（Viterbi 动态规划），切换方式时计入 penalty。
+
+    :param costs: (M, n, n) 各交通方式的代价矩阵
+    :param penalty: (M, M) 换乘惩罚，penalty[a, b] 为从方式 a 换到方式 b 的额外代价
+    :param sequence: 含起点的完整节点序列
+    :return: (每段的方式下标列表, 总代价)
+    """
+    costs = np.asarray(costs, dtype=float)
+    penalty = np.asarray(penalty, dtype=float)
+    legs = list(zip(sequence, sequence[1:]))
+    if not legs:
+        return [], 0.0
+    best = costs[:, legs[0][0], legs[0][1]].copy()  # 第一段没有换乘惩罚
+    choices = []
+    for a, b in legs[1:]:
+        # through[prev, mode] = best[prev] + penalty[prev, mode]
+        through = best[:, None] + penalty
+        choice = through.argmin(axis=0)
+        best = through[choice, np.arange(len(best))] + costs[:, a, b]
+        choices.append(choice)
+    mode = int(best.argmin())
+    total = float(best[mode])
+    modes = [mode]
+    for choice in reversed(choices):
+        mode = int(choice[mode])
+        modes.append(mode)
+    modes.reverse()
+    return modes, total
+
+
+def held_karp_modes(costs, penalty):
+    """
+    多交通方式的 Held–Karp：状态为 (已访问集合, 当前节点, 到达当前节点所用方式)，
+    每一段可以选择任意方式，方式切换时计入 penalty。
+
+    :param costs: (M, n, n) 各交通方式的代价矩阵，节点约定同 held_karp
+    :param penalty: (M, M) 换乘惩罚
+    :return: (访问顺序, 每段的方式下标列表, 总代价)；不可行时返回 ([], [], inf)
+    """
+    costs = np.asarray(costs, dtype=float)
+    penalty = np.asarray(penalty, dtype=float)
+    modes, n = costs.shape[0], costs.shape[1]
+    end = n - 1
+    m = n - 2
+    if m < 0:
+        raise ValueError("代价矩阵至少需要包含起点和终点")
+    if m > HELD_KARP_MODES_MAX_STOPS:
+        raise ValueError(f"混合出行的中间点数量 {m} 超过精确求解上限 {HELD_KARP_MODES_MAX_STOPS}")
+    if m == 0:
+        mode = int(costs[:, 0, end].argmin())
+        total = float(costs[mode, 0, end])
+        return ([end], [mode], total) if np.isfinite(total) else ([], [], float('inf'))
+
+    # mid_cost_t[mode, j, i] = cost[mode, i -> j]
+    mid_cost_t = costs[:, 1:end, 1:end].transpose(0, 2, 1)
+    size = 1 << m
+    # dp[mask, j, mode]：访问 mask 中的中间点、以方式 mode 到达 j 的最小代价
+    dp = np.full((size, m, modes), np.inf)
+    parent_node = np.zeros((size, m, modes), dtype=np.int8)
+    parent_mode = np.zeros((size, m, modes), dtype=np.int8)
+    bits = 1 << np.arange(m)
+    dp[bits, np.arange(m), :] = costs[:, 0, 1:end].T
+
+    masks = np.arange(size)
+    popcount = np.zeros(size, dtype=np.int8)
+    for j in range(m):
+        popcount += (masks >> j) & 1
+
+    chunk_size = max(1, _CHUNK // modes)
+    for k in range(2, m + 1):
+        layer = np.flatnonzero(popcount == k)
+        for chunk_start in range(0, len(layer), chunk_size):
+            _check_cancelled()
+            chunk = layer[chunk_start:chunk_start + chunk_size]
+            prev = chunk[:, None] ^ bits[None, :]
+            # 先对上一段的方式取最优：through[s, j, i, mode] = min_pm dp[prev, i, pm] + penalty[pm, mode]
+            previous = dp[prev]  # (S, m_j, m_i, M_prev)
+            through_all = previous[..., :, None] + penalty  # (S, m_j, m_i, M_prev, M)
+            best_prev_mode = through_all.argmin(axis=3)
+            through = np.take_along_axis(through_all, best_prev_mode[..., None, :], axis=3)[..., 0, :]
+            # candidate[s, j, i, mode] = through[s, j, i, mode] + cost[mode, i -> j]
+            candidate = through + mid_cost_t.transpose(1, 2, 0)[None]
+            best_node = candidate.argmin(axis=2)  # (S, m_j, M)
+            dp[chunk] = np.take_along_axis(candidate, best_node[:, :, None, :], axis=2)[:, :, 0, :]
+            parent_node[chunk] = best_node
+            parent_mode[chunk] = np.take_along_axis(best_prev_mode, best_node[:, :, None, :], axis=2)[:, :, 0, :]
+
+    full = size - 1
+    # 最后一段到终点：totals[j, mode_last] = min_pm dp[full, j, pm] + penalty[pm, mode_last] + cost[mode_last, j, end]
+    through_all = dp[full][:, :, None] + penalty  # (m, M_prev, M)
+    last_prev_mode = through_all.argmin(axis=1)
+    through = np.take_along_axis(through_all, last_prev_mode[:, None, :], axis=1)[:, 0, :]
+    totals = through + costs[:, 1:end, end].T
+    last, final_mode = np.unravel_index(int(totals.argmin()), totals.shape)
+    total = float(totals[last, final_mode])
+    if not np.isfinite(total):
+        return [], [], float('inf')
+
+    order = [end]
+    leg_modes = [int(final_mode)]
+    node, mode = int(last), int(last_prev_mode[last, final_mode])
+    mask = full
+    while mask:
+        order.append(node + 1)
+        leg_modes.append(mode)
+        previous_node = int(parent_node[mask, node, mode])
+        previous_mode = int(parent_mode[mask, node, mode])
+        mask ^= 1 << node
+        node, mode = previous_node, previous_mode
+    order.reverse()
+    leg_modes.reverse()
+    return order, leg_modes, total
+
+
+def solve_path_modes(costs, penalty, solver='auto', budget_ms=None):
+    """
+    多交通方式求解入口。精确模式用 held_karp_modes；启发式模式先在“每段取最便宜方式”的矩阵上
+    求访问顺序，再用 assign_modes 按换乘惩罚重新分配每段的方式。
+
+    :return: (访问顺序, 每段的方式下标列表, 总代价, 实际使用的求解方式, 最优性差距估计)
+    """
+    costs = np.asarray(costs, dtype=float)
+    stops = costs.shape[1] - 2
+    if solver == 'auto':
+        solver = 'exact' if stops <= AUTO_EXACT_STOPS else 'heuristic'
+    if solver == 'exact':
+        order, leg_modes, total = held_karp_modes(costs, penalty)
+        return order, leg_modes, total, solver, 0.0 if order else None
+    if solver == 'heuristic':
+        order, _, gap = heuristic_path(costs.min(axis=0), budget_ms if budget_ms is not None else DEFAULT_BUDGET_MS)
+        if not order:
+            return [], [], float('inf'), solver, None
+        leg_modes, total = assign_modes(costs, penalty, [0] + order)
+        return order, leg_modes, total, solver, gap
+    raise ValueError(f"未知的求解方式: {solver}")